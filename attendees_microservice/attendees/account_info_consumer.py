@@ -1,70 +1,91 @@
 from datetime import datetime
 import json
-import pika
-from pika.exceptions import AMQPConnectionError
 import django
 import os
 import sys
-import time
 
 
 sys.path.append("")
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "attendees_bc.settings")
 django.setup()
 
+from django.conf import settings
+from django.db import transaction
 from attendees.models import AccountVO
-
-
-def update_AccountVO(ch, method, properties, body):
-    content = json.loads(body)
-    first_name = content["first_name"]
-    last_name = content["last_name"]
-    email = content["email"]
-    is_active = content["is_active"]
-    updated_string = content["updated"]
-    updated = datetime.fromisoformat(updated_string)
-
-    if is_active:
-        AccountVO.objects.update_or_create(
-            email=email,
-            defaults={
-                "first_name": first_name,
-                "last_name": last_name,
-                "is_active": is_active,
-                "updated": updated,
+from common.consumer import Subscription, run
+
+
+def update_AccountVOs(bodies):
+    """
+    Applies a batch of account_info messages in one transaction. When
+    the batch has several messages for one email, only the one with
+    the newest "updated" counts.
+    """
+    latest = {}
+    for body in bodies:
+        # every field is checked here, so one bad message is skipped
+        # instead of failing, and redelivering, the whole batch
+        try:
+            content = json.loads(body)
+            account = {
+                "email": content["email"],
+                "first_name": content["first_name"],
+                "last_name": content["last_name"],
+                "is_active": content["is_active"],
+                "updated": datetime.fromisoformat(content["updated"]),
             }
+            if not all(
+                isinstance(account[name], str)
+                for name in ["email", "first_name", "last_name"]
+            ):
+                raise TypeError("names must be strings")
+            if not isinstance(account["is_active"], bool):
+                raise TypeError("is_active must be a boolean")
+            if account["updated"].tzinfo is None:
+                raise ValueError("updated has no time zone")
+        except (ValueError, KeyError, TypeError):
+            print("Skipping malformed account_info message:", body)
+            continue
+        current = latest.get(account["email"])
+        if current is None or account["updated"] >= current["updated"]:
+            latest[account["email"]] = account
+
+    active = [
+        AccountVO(
+            email=email,
+            first_name=account["first_name"],
+            last_name=account["last_name"],
+            is_active=True,
+            updated=account["updated"],
+        )
+        for email, account in latest.items()
+        if account["is_active"]
+    ]
+    inactive = [
+        email for email, account in latest.items() if not account["is_active"]
+    ]
+    with transaction.atomic():
+        if inactive:
+            AccountVO.objects.filter(email__in=inactive).delete()
+        AccountVO.objects.bulk_create(
+            active,
+            update_conflicts=True,
+            unique_fields=["email"],
+            update_fields=["first_name", "last_name", "is_active", "updated"],
         )
-    else:
-        AccountVO.objects.filter(email=email).delete()
-
-
-while True:
-    try:
-        connection_params = pika.ConnectionParameters(host="rabbitmq")
-
-        with pika.BlockingConnection(connection_params) as connection:
 
-            channel = connection.channel()
 
-            channel.exchange_declare(
+if __name__ == "__main__":
+    run(
+        [
+            Subscription(
+                "attendees_account_info",
+                update_AccountVOs,
                 exchange="account_info",
-                exchange_type="fanout"
-                )
-
-            result = channel.queue_declare(queue="", exclusive=True)
-
-            queue_name = result.method.queue
-
-            channel.queue_bind(exchange="account_info", queue=queue_name)
-
-            channel.basic_consume(
-                queue=queue_name,
-                on_message_callback=update_AccountVO,
-                auto_ack=True,
-                )
-
-            channel.start_consuming()
-
-    except AMQPConnectionError:
-        print("Could not connect to RabbitMQ, trying again in a couple of seconds...")
-        time.sleep(2)
+                durable=True,
+                **settings.CONSUMER_QUEUES["attendees_account_info"],
+            ),
+        ],
+        settings.BROKER_HOST,
+        settings.BROKER_PORT,
+    )
@@ -1,6 +1,8 @@
+from django.db import IntegrityError
 from django.http import JsonResponse
-from .models import Attendee, ConferenceVO, AccountVO
+from .models import Attendee, ConferenceVO, AccountVO, conferences
 from common.json import ModelEncoder
+from common.pagination import paginated_json_response
 from django.views.decorators.http import require_http_methods
 import json
 
@@ -32,19 +34,15 @@ class AttendeeDetailEncoder(ModelEncoder):
     encoders = {
         "conference": ConferenceVODetailEncoder(),
     }
+    extra_data_fields = ["email"]
 
     def get_extra_data(self, o):
-        count = AccountVO.objects.filter(email=o.email).count()
-        if count > 0:
-            return {
-                "has_account": True
-            }
-        else:
-            return {
-                "has_account": False
-            }
-        # has_account = True if count > 0 else False
-        # return {"has_account": has_account}
+        # views load attendees with Attendee.objects.with_has_account()
+        has_account = getattr(o, "has_account", None)
+        if has_account is None:
+            has_account = AccountVO.objects.filter(email=o.email).exists()
+        return {"has_account": has_account}
+
     """
     Since badge is a related object, we need to customize the encoding
     of that object. We can do that by overriding the 'default()' method.
@@ -83,18 +81,24 @@ def api_list_attendees(request, conference_vo_id=None):
             ...
         ]
     }
+
+    When the query string has a "limit" or a "cursor", only one page
+    of at most "limit" entries is returned, along with a "next" key
+    holding the URL of the following page (null on the last page).
     """
     if request.method == "GET":
         attendees = Attendee.objects.filter(conference=conference_vo_id)
-        return JsonResponse(
-            {"attendees": attendees},
-            encoder=AttendeeListEncoder,
+        return paginated_json_response(
+            request,
+            "attendees",
+            attendees,
+            AttendeeListEncoder,
         )
     else:
         content = json.loads(request.body)
         try:
             conference_href = f'/api/conferences/{conference_vo_id}/'
-            conference = ConferenceVO.objects.get(import_href=conference_href)
+            conference = conferences.get(import_href=conference_href)
             content["conference"] = conference
         except ConferenceVO.DoesNotExist:
             #     conference = ConferenceVO.objects.create(
@@ -111,7 +115,16 @@ def api_list_attendees(request, conference_vo_id=None):
                 {"message": "Invalid conference id"},
                 status=400,
             )
-        attendee = Attendee.objects.create(**content)
+        try:
+            attendee = Attendee.objects.create(**content)
+        except IntegrityError:
+            # the conference was deleted by another process since it
+            # was cached
+            conferences.invalidate()
+            return JsonResponse(
+                {"message": "Invalid conference id"},
+                status=400,
+            )
         return JsonResponse(
             attendee,
             encoder=AttendeeDetailEncoder,
@@ -141,7 +154,7 @@ def api_show_attendee(request, id):
     }
     """
     if request.method == "GET":
-        attendee = Attendee.objects.get(id=id)
+        attendee = Attendee.objects.with_has_account().get(id=id)
         return JsonResponse(
             {"attendee": attendee}, encoder=AttendeeDetailEncoder
             )
@@ -152,7 +165,7 @@ def api_show_attendee(request, id):
         content = json.loads(request.body)
         Attendee.objects.filter(id=id).update(**content)
 
-        attendee = Attendee.objects.get(id=id)
+        attendee = Attendee.objects.with_has_account().get(id=id)
         return JsonResponse(
             attendee,
             encoder=AttendeeDetailEncoder,
@@ -0,0 +1,56 @@
+import json
+import django
+import os
+import sys
+
+
+sys.path.append("")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "attendees_bc.settings")
+django.setup()
+
+from django.conf import settings
+from django.db import transaction
+from attendees.models import ConferenceVO
+from common.consumer import Subscription, run
+
+
+def update_ConferenceVOs(bodies):
+    """
+    Applies a batch of conference_info messages, in order, in one
+    transaction.
+    """
+    with transaction.atomic():
+        for body in bodies:
+            try:
+                content = json.loads(body)
+                conference = content["conference"]
+                import_href = conference["href"]
+            except (ValueError, KeyError, TypeError):
+                print("Skipping malformed conference_info message:", body)
+                continue
+
+            if content["deleted"]:
+                ConferenceVO.objects.filter(import_href=import_href).delete()
+            else:
+                ConferenceVO.objects.update_or_create(
+                    import_href=import_href,
+                    defaults={"name": conference["name"]},
+                )
+
+
+if __name__ == "__main__":
+    # a named, durable queue keeps the events published while this
+    # consumer is down, so nothing waits for the next poll
+    run(
+        [
+            Subscription(
+                "attendees_conferences",
+                update_ConferenceVOs,
+                exchange="conference_info",
+                durable=True,
+                **settings.CONSUMER_QUEUES["attendees_conferences"],
+            ),
+        ],
+        settings.BROKER_HOST,
+        settings.BROKER_PORT,
+    )
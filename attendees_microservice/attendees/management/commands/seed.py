@@ -0,0 +1,143 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import now
+
+from attendees.models import AccountVO, Attendee, Badge, ConferenceVO
+from common.seeding import (
+    COMPANIES,
+    EPOCH,
+    bulk_insert,
+    conference_href,
+    conference_names,
+    db_value,
+    insert_rows,
+    people,
+    reset_sequences,
+    sizes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills an empty database with generated conferences, accounts, "
+        "attendees and badges that match what the monolith's seed "
+        "command writes with the same --scale and --seed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="1 is 1,000 conferences and 100,000 attendees",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="seed for the generated data",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="rows written per insert",
+        )
+
+    def handle(self, *args, **options):
+        if (
+            ConferenceVO.objects.exists()
+            or Attendee.objects.exists()
+            or AccountVO.objects.exists()
+        ):
+            raise CommandError(
+                "The database already has data; run manage.py flush first"
+            )
+
+        started = time.monotonic()
+        seed = options["seed"]
+        batch_size = options["batch_size"]
+        counts = sizes(options["scale"])
+        everyone = people(seed, counts["people"])
+        # every row gets the same timestamps, converted for the database
+        # once
+        created = db_value(Attendee, "created", now())
+        updated = db_value(AccountVO, "updated", EPOCH)
+        with transaction.atomic():
+            written = {
+                "conferences": bulk_insert(
+                    ConferenceVO,
+                    self.conferences(seed, counts["conferences"]),
+                    batch_size,
+                ),
+                # the monolith's users, as account_info would have
+                # delivered them
+                "accounts": insert_rows(
+                    AccountVO,
+                    [
+                        "email",
+                        "first_name",
+                        "last_name",
+                        "is_active",
+                        "updated",
+                    ],
+                    (
+                        (email, first, last, True, updated)
+                        for first, last, email in everyone[: counts["users"]]
+                    ),
+                    batch_size,
+                ),
+                "attendees": insert_rows(
+                    Attendee,
+                    [
+                        "id",
+                        "email",
+                        "name",
+                        "company_name",
+                        "created",
+                        "conference",
+                    ],
+                    self.attendees(seed, counts, everyone, created),
+                    batch_size,
+                ),
+                # every other attendee has picked up a badge
+                "badges": insert_rows(
+                    Badge,
+                    ["attendee", "created"],
+                    (
+                        (id, created)
+                        for id in range(1, counts["attendees"] + 1, 2)
+                    ),
+                    batch_size,
+                ),
+            }
+            reset_sequences(ConferenceVO, Attendee)
+
+        summary = ", ".join(f"{n} {name}" for name, n in written.items())
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Seeded {summary} in {elapsed:.1f}s")
+        )
+
+    def conferences(self, seed, count):
+        for id, name in conference_names(seed, count):
+            yield ConferenceVO(
+                id=id, import_href=conference_href(id), name=name
+            )
+
+    def attendees(self, seed, counts, everyone, created):
+        rng = random.Random(f"{seed}:attendees")
+        companies = COMPANIES + [None]
+        for id in range(1, counts["attendees"] + 1):
+            first, last, email = rng.choice(everyone)
+            yield (
+                id,
+                email,
+                f"{first} {last}",
+                rng.choice(companies),
+                created,
+                rng.randint(1, counts["conferences"]),
+            )
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.7 on 2026-10-18 16:57
+
+from django.db import migrations, models
+
+
+def remove_duplicate_accounts(apps, schema_editor):
+    # the account_info consumer keeps one row per email, but keep only
+    # the most recently updated row in case an older copy slipped in
+    AccountVO = apps.get_model("attendees", "AccountVO")
+    seen = set()
+    duplicates = []
+    for id, email in AccountVO.objects.order_by(
+        "email", "-updated", "-id"
+    ).values_list("id", "email"):
+        if email in seen:
+            duplicates.append(id)
+        seen.add(email)
+    AccountVO.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("attendees", "0002_accountvo"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_accounts, migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name="accountvo",
+            name="email",
+            field=models.EmailField(max_length=254, unique=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.7 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("attendees", "0003_accountvo_email_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PollState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("url", models.CharField(max_length=200, unique=True)),
+                ("etag", models.CharField(max_length=200)),
+            ],
+        ),
+    ]
@@ -3,9 +3,12 @@ from django.urls import reverse
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.timezone import now
 
+from common.registry import ValueObjectRegistry
+
 
 class AccountVO(models.Model):
-    email = models.EmailField()
+    # unique, so that has_account is one index lookup per attendee
+    email = models.EmailField(unique=True)
     first_name = models.CharField(max_length=20)
     last_name = models.CharField(max_length=20)
     is_active = models.BooleanField(default=True)
@@ -20,12 +23,42 @@ class ConferenceVO(models.Model):
     name = models.CharField(max_length=200)
 
 
+# registration resolves the conference from the URL on every POST
+conferences = ValueObjectRegistry(ConferenceVO, "import_href")
+
+
+class PollState(models.Model):
+    """
+    The PollState model remembers, per polled URL, the ETag of the last
+    response a poller applied, so that its next poll can be a
+    conditional GET.
+    """
+
+    url = models.CharField(max_length=200, unique=True)
+    etag = models.CharField(max_length=200)
+
+
+class AttendeeQuerySet(models.QuerySet):
+    def with_has_account(self):
+        """
+        Annotates each attendee with has_account, whether an AccountVO
+        has their email, as an EXISTS subquery in the same query.
+        """
+        return self.annotate(
+            has_account=models.Exists(
+                AccountVO.objects.filter(email=models.OuterRef("email"))
+            )
+        )
+
+
 class Attendee(models.Model):
     """
     The Attendee model represents someone that wants to attend
     a conference
     """
 
+    objects = AttendeeQuerySet.as_manager()
+
     email = models.EmailField()
     name = models.CharField(max_length=200)
     company_name = models.CharField(max_length=200, null=True, blank=True)
@@ -40,8 +73,10 @@ class Attendee(models.Model):
     def __str__(self):
         return self.name
 
+    api_url_name = "api_show_attendee"
+
     def get_api_url(self):
-        return reverse("api_show_attendee", kwargs={"id": self.id})
+        return reverse(self.api_url_name, kwargs={"id": self.id})
 
     def create_badge(self):
         """
@@ -1,15 +1,88 @@
-import json
 import requests
+from django.db import transaction
 
-from .models import ConferenceVO
+from .models import ConferenceVO, PollState, conferences
 
 
-def get_conference():
-    url = "http://monolith:8000/api/conferences/"
-    response = requests.get(url)
-    content = json.loads(response.content)
-    for conference in content["conferences"]:
-        ConferenceVO.objects.update_or_create(
-            import_href=conference["href"],
-            defaults={"name": conference["name"]},
+MONOLITH_URL = "http://monolith:8000"
+CONFERENCES_URL = f"{MONOLITH_URL}/api/conferences/"
+PAGE_SIZE = 1000
+DELETE_BATCH_SIZE = 500
+# (connect, read) timeouts, so a stuck monolith can't pile up cron runs
+TIMEOUT = (3.05, 30)
+
+# one keep-alive connection for all of a poll's pages
+session = requests.Session()
+
+
+def get_conferences():
+    """
+    Mirrors the monolith's conferences into ConferenceVO.
+
+    The first page is a conditional GET on the ETag of the last list
+    that was applied, so while nothing has changed a poll is a single
+    304 and one read query. Otherwise every page is fetched and diffed
+    against the existing rows in memory. New and renamed conferences
+    are written, and conferences the monolith no longer lists are
+    deleted with their attendees, in one transaction. That catches up
+    on conference_info events missed while the consumer was down.
+    """
+    url = f"{CONFERENCES_URL}?limit={PAGE_SIZE}"
+    state = PollState.objects.filter(url=CONFERENCES_URL).first()
+    headers = {"If-None-Match": state.etag} if state else {}
+    response = session.get(url, headers=headers, timeout=TIMEOUT)
+    if response.status_code == 304:
+        return
+    response.raise_for_status()
+    etag = response.headers.get("ETag")
+
+    # read before the pages, so that a conference the consumer adds
+    # while they are fetched can't be taken for a deleted one
+    existing = {
+        vo.import_href: vo
+        for vo in ConferenceVO.objects.only("id", "import_href", "name")
+    }
+
+    # walk the keyset pages until the monolith stops handing out a
+    # "next" link
+    names = {}
+    while True:
+        content = response.json()
+        for conference in content["conferences"]:
+            names[conference["href"]] = conference["name"]
+        if not content["next"]:
+            break
+        response = session.get(MONOLITH_URL + content["next"], timeout=TIMEOUT)
+        response.raise_for_status()
+
+    new = []
+    changed = []
+    for href, name in names.items():
+        vo = existing.get(href)
+        if vo is None:
+            new.append(ConferenceVO(import_href=href, name=name))
+        elif vo.name != name:
+            vo.name = name
+            changed.append(vo)
+    deleted = [vo.id for href, vo in existing.items() if href not in names]
+
+    with transaction.atomic():
+        # the consumer may have added some of them since the read
+        ConferenceVO.objects.bulk_create(
+            new, batch_size=PAGE_SIZE, ignore_conflicts=True
+        )
+        ConferenceVO.objects.bulk_update(
+            changed, ["name"], batch_size=PAGE_SIZE
         )
+        # in batches that stay under SQLite's limit on query parameters
+        for start in range(0, len(deleted), DELETE_BATCH_SIZE):
+            end = start + DELETE_BATCH_SIZE
+            ConferenceVO.objects.filter(id__in=deleted[start:end]).delete()
+        if etag and state is None:
+            PollState.objects.create(url=CONFERENCES_URL, etag=etag)
+        elif etag and state.etag != etag:
+            state.etag = etag
+            state.save(update_fields=["etag"])
+    if new or changed or deleted:
+        # bulk writes skip the signals that keep the registry current
+        conferences.invalidate()
@@ -0,0 +1,364 @@
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import threading
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from django.test import TestCase
+from django.urls import reverse
+
+from common.testing import assert_constant_queries
+from . import poll
+from .account_info_consumer import update_AccountVOs
+from .models import AccountVO, Attendee, ConferenceVO, PollState
+
+
+NOW = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+ids = itertools.count(1)
+
+
+class ListEndpointQueriesTests(TestCase):
+    """
+    The attendee list, streamed and paged, runs the same number of
+    queries however many attendees it lists.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.conference = ConferenceVO.objects.create(
+            import_href="/api/conferences/1/", name="Conference 1"
+        )
+
+    def add_attendee(self):
+        n = next(ids)
+        email = f"attendee{n}@example.com"
+        # every other attendee has an account
+        if n % 2:
+            AccountVO.objects.create(
+                email=email, first_name="Ada", last_name="Lopez"
+            )
+        return Attendee.objects.create(
+            email=email, name=f"Attendee {n}", conference=self.conference
+        )
+
+    def test_list_attendees(self):
+        url = reverse(
+            "api_list_attendees",
+            kwargs={"conference_vo_id": self.conference.id},
+        )
+
+        def add_rows():
+            for _ in range(5):
+                self.add_attendee()
+
+        for query in ["", "?limit=3"]:
+            with self.subTest(url=url + query):
+                self.add_attendee()
+                assert_constant_queries(self.client, url + query, add_rows)
+
+
+def account_info(email, minutes=0, **fields):
+    content = {
+        "email": email,
+        "first_name": "Ada",
+        "last_name": "Lopez",
+        "is_active": True,
+        "updated": (NOW + timedelta(minutes=minutes)).isoformat(),
+        **fields,
+    }
+    return json.dumps(content).encode()
+
+
+class AccountInfoConsumerTests(TestCase):
+    """
+    update_AccountVOs applies a batch of account_info messages.
+    """
+
+    def setUp(self):
+        self.enterContext(mock.patch("builtins.print"))
+
+    def accounts(self):
+        return {
+            account.email: (account.first_name, account.updated)
+            for account in AccountVO.objects.all()
+        }
+
+    def test_creates_and_updates(self):
+        AccountVO.objects.create(
+            email="old@example.com", first_name="Old", last_name="Name"
+        )
+        update_AccountVOs(
+            [
+                account_info("new@example.com"),
+                account_info("old@example.com", 1, first_name="Grace"),
+            ]
+        )
+        self.assertEqual(
+            self.accounts(),
+            {
+                "new@example.com": ("Ada", NOW),
+                "old@example.com": ("Grace", NOW + timedelta(minutes=1)),
+            },
+        )
+
+    def test_newest_message_per_email_wins(self):
+        update_AccountVOs(
+            [
+                account_info("ada@example.com", 2, first_name="Newest"),
+                account_info("ada@example.com", 0, first_name="Oldest"),
+                account_info("ada@example.com", 1, first_name="Middle"),
+            ]
+        )
+        self.assertEqual(
+            self.accounts(),
+            {"ada@example.com": ("Newest", NOW + timedelta(minutes=2))},
+        )
+
+    def test_newest_deactivation_deletes(self):
+        AccountVO.objects.create(
+            email="ada@example.com", first_name="Ada", last_name="Lopez"
+        )
+        update_AccountVOs(
+            [
+                account_info("ada@example.com", 0),
+                account_info("ada@example.com", 1, is_active=False),
+                account_info("gone@example.com", 0, is_active=False),
+            ]
+        )
+        self.assertEqual(self.accounts(), {})
+
+    def test_reactivation_after_deactivation(self):
+        AccountVO.objects.create(
+            email="ada@example.com", first_name="Ada", last_name="Lopez"
+        )
+        update_AccountVOs(
+            [
+                account_info("ada@example.com", 0, is_active=False),
+                account_info("ada@example.com", 1, first_name="Back"),
+            ]
+        )
+        self.assertEqual(
+            self.accounts(),
+            {"ada@example.com": ("Back", NOW + timedelta(minutes=1))},
+        )
+
+    def test_invalid_messages_are_skipped(self):
+        invalid = [
+            b"not json",
+            b"[]",
+            json.dumps({"email": "a@example.com"}).encode(),
+            account_info("b@example.com", first_name=None),
+            account_info("c@example.com", is_active="yes"),
+            account_info("d@example.com", updated="yesterday"),
+            account_info("e@example.com", updated="2023-01-01T00:00:00"),
+            account_info("f@example.com", updated=5),
+            # would otherwise win over the valid message below
+            account_info("ada@example.com", 5, is_active=1),
+        ]
+        update_AccountVOs(invalid + [account_info("ada@example.com")])
+        self.assertEqual(self.accounts(), {"ada@example.com": ("Ada", NOW)})
+
+
+class MonolithStubHandler(BaseHTTPRequestHandler):
+    """
+    Answers GET /api/conferences/ like the monolith: keyset pages of
+    server.conferences, with server.etag as the list's ETag, and a 304
+    when the request's If-None-Match matches it.
+    """
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {
+            name: values[0] for name, values in parse_qs(url.query).items()
+        }
+        self.server.requests.append(
+            (self.path, self.headers.get("If-None-Match"))
+        )
+        if self.headers.get("If-None-Match") == self.server.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.server.etag)
+            self.end_headers()
+            return
+        limit = int(query["limit"])
+        start = int(query.get("cursor", 0))
+        end = start + limit
+        next_url = None
+        if end < len(self.server.conferences):
+            next_url = f"{url.path}?limit={limit}&cursor={end}"
+        body = json.dumps(
+            {
+                "conferences": [
+                    {"href": f"/api/conferences/{id}/", "name": name}
+                    for id, name in self.server.conferences[start:end]
+                ],
+                "next": next_url,
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.server.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PollTests(TestCase):
+    """
+    get_conferences against a stub of the monolith's conference list.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MonolithStubHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.conferences = []
+        self.server.etag = '"1"'
+        self.server.requests = []
+        for name, value in [
+            ("MONOLITH_URL", self.url),
+            ("CONFERENCES_URL", f"{self.url}/api/conferences/"),
+            ("PAGE_SIZE", 2),
+            ("DELETE_BATCH_SIZE", 2),
+        ]:
+            self.enterContext(mock.patch.object(poll, name, value))
+        self.invalidate = self.enterContext(
+            mock.patch.object(poll.conferences, "invalidate")
+        )
+
+    def publish(self, etag, *conferences):
+        self.server.etag = etag
+        self.server.conferences = list(conferences)
+        self.server.requests = []
+
+    def mirrored(self):
+        return dict(ConferenceVO.objects.values_list("import_href", "name"))
+
+    def test_pages_are_mirrored(self):
+        self.publish('"1"', (1, "One"), (2, "Two"), (3, "Three"))
+        poll.get_conferences()
+        self.assertEqual(
+            self.mirrored(),
+            {
+                "/api/conferences/1/": "One",
+                "/api/conferences/2/": "Two",
+                "/api/conferences/3/": "Three",
+            },
+        )
+        self.assertEqual(
+            self.server.requests,
+            [
+                ("/api/conferences/?limit=2", None),
+                ("/api/conferences/?limit=2&cursor=2", None),
+            ],
+        )
+        self.assertEqual(PollState.objects.get().etag, '"1"')
+        self.invalidate.assert_called_once()
+
+    def test_unchanged_list_is_a_304(self):
+        self.publish('"1"', (1, "One"))
+        poll.get_conferences()
+        self.invalidate.reset_mock()
+        self.server.requests = []
+        with self.assertNumQueries(1):
+            poll.get_conferences()
+        self.assertEqual(
+            self.server.requests, [("/api/conferences/?limit=2", '"1"')]
+        )
+        self.invalidate.assert_not_called()
+
+    def test_diff_creates_and_renames(self):
+        self.publish('"1"', (1, "One"), (2, "Two"))
+        poll.get_conferences()
+        self.invalidate.reset_mock()
+
+        self.publish('"2"', (1, "One"), (2, "Renamed"), (3, "Three"))
+        poll.get_conferences()
+        self.assertEqual(
+            self.mirrored(),
+            {
+                "/api/conferences/1/": "One",
+                "/api/conferences/2/": "Renamed",
+                "/api/conferences/3/": "Three",
+            },
+        )
+        self.assertEqual(PollState.objects.get().etag, '"2"')
+        self.assertEqual(self.server.requests[0][1], '"1"')
+        self.invalidate.assert_called_once()
+
+    def test_changed_etag_with_same_list_writes_nothing(self):
+        self.publish('"1"', (1, "One"))
+        poll.get_conferences()
+        self.invalidate.reset_mock()
+        self.publish('"2"', (1, "One"))
+        poll.get_conferences()
+        self.assertEqual(self.mirrored(), {"/api/conferences/1/": "One"})
+        self.assertEqual(PollState.objects.get().etag, '"2"')
+        self.invalidate.assert_not_called()
+
+    def test_missing_conferences_are_deleted(self):
+        self.publish('"1"', *[(id, f"Conference {id}") for id in range(1, 6)])
+        poll.get_conferences()
+        for href in ["/api/conferences/2/", "/api/conferences/5/"]:
+            Attendee.objects.create(
+                email="ada@example.com",
+                name="Ada",
+                conference=ConferenceVO.objects.get(import_href=href),
+            )
+        self.invalidate.reset_mock()
+
+        self.publish('"2"', (1, "Conference 1"), (5, "Conference 5"))
+        poll.get_conferences()
+        self.assertEqual(
+            self.mirrored(),
+            {
+                "/api/conferences/1/": "Conference 1",
+                "/api/conferences/5/": "Conference 5",
+            },
+        )
+        # the deleted conferences' attendees go with them
+        self.assertEqual(
+            list(
+                Attendee.objects.values_list(
+                    "conference__import_href", flat=True
+                )
+            ),
+            ["/api/conferences/5/"],
+        )
+        self.invalidate.assert_called_once()
+
+    def test_conference_added_during_the_poll_is_kept(self):
+        # one the consumer adds after the poll's read of the existing rows
+        self.publish('"1"', (1, "One"))
+        original = ConferenceVO.objects.only
+
+        def only(*fields):
+            rows = list(original(*fields))
+            ConferenceVO.objects.create(
+                import_href="/api/conferences/9/", name="Nine"
+            )
+            return rows
+
+        with mock.patch.object(ConferenceVO.objects, "only", only):
+            poll.get_conferences()
+        self.assertEqual(
+            self.mirrored(),
+            {"/api/conferences/1/": "One", "/api/conferences/9/": "Nine"},
+        )
@@ -27,10 +27,27 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# conference changes arrive from the monolith over the conference_info
+# exchange (attendees/conference_info_consumer.py); the hourly poll only
+# reconciles anything missed while the consumer was down
 CRONJOBS = [
-    ("* * * * *", "attendees.poll.get_conferences"),
+    ("0 * * * *", "attendees.poll.get_conferences"),
 ]
 
+# RabbitMQ, read by attendees/account_info_consumer.py and
+# attendees/conference_info_consumer.py. Every queue gets "workers"
+# threads, each with its own connection and a prefetch of one batch.
+# attendees_account_info must keep one worker: account updates have to
+# be applied in the order they were queued, and two workers would
+# commit their batches in either order.
+
+BROKER_HOST = "rabbitmq"
+BROKER_PORT = 5672
+CONSUMER_QUEUES = {
+    "attendees_account_info": {"workers": 1, "batch_size": 500},
+    "attendees_conferences": {"workers": 1, "batch_size": 100},
+}
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -45,6 +62,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "common.timing.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -126,3 +144,11 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Set SERVER_TIMING to add a Server-Timing header with the time spent in
+# SQL, upstream calls, publishing and JSON encoding to every response,
+# and to print a JSON line with the worst SQL of each request slower
+# than SLOW_REQUEST_SECONDS
+
+SERVER_TIMING = False
+SLOW_REQUEST_SECONDS = 0.5
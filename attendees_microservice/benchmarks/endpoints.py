@@ -0,0 +1,148 @@
+"""
+Latency, throughput and SQL queries of the attendees service's GET
+endpoints, run through Django's test client against a database filled
+by the seed command. None of these endpoints calls out to the monolith
+or RabbitMQ, so nothing needs stubbing.
+
+Every endpoint has a query budget in QUERY_BUDGETS, and the run exits
+with status 1 when one is exceeded. The seeded database is kept
+between runs, one per scale and seed, so that runs on different
+commits measure the same data; diff their --json files to compare.
+
+Run from the attendees_microservice directory:
+
+    python -m benchmarks.endpoints --scale 1 --requests 200 \\
+        --json endpoints.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import django
+
+
+# the most SQL queries one GET of each endpoint may run, whatever the
+# size of the page
+QUERY_BUDGETS = {
+    "api_list_attendees": 1,
+    "api_show_attendee": 1,
+}
+
+# the limits the list endpoints are measured with
+PAGE_SIZES = [10, 100, 1000]
+
+
+def seed_database(scale, seed):
+    from django.core.management import call_command
+    from attendees.models import ConferenceVO
+
+    call_command("migrate", verbosity=0)
+    if not ConferenceVO.objects.exists():
+        call_command("seed", scale=scale, seed=seed)
+
+
+def endpoints():
+    """
+    Returns a (name, url, query budget) tuple per page size of every
+    list endpoint and for every detail endpoint.
+    """
+    from django.db.models import Count
+    from django.urls import reverse
+    from attendees.models import Attendee, ConferenceVO
+
+    # the conference with the most attendees gives the largest pages
+    conference = (
+        ConferenceVO.objects.annotate(count=Count("attendees"))
+        .order_by("-count")
+        .values_list("id", flat=True)
+        .first()
+    )
+    attendee = (
+        Attendee.objects.filter(conference=conference)
+        .values_list("id", flat=True)
+        .first()
+    )
+    url = reverse(
+        "api_list_attendees", kwargs={"conference_vo_id": conference}
+    )
+    budget = QUERY_BUDGETS["api_list_attendees"]
+    cases = [
+        (f"api_list_attendees?limit={size}", f"{url}?limit={size}", budget)
+        for size in PAGE_SIZES
+    ]
+    cases.append(("api_list_attendees", url, budget))
+    cases.append(
+        (
+            "api_show_attendee",
+            reverse("api_show_attendee", kwargs={"id": attendee}),
+            QUERY_BUDGETS["api_show_attendee"],
+        )
+    )
+    return cases
+
+
+def git_commit():
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--database",
+        help="SQLite file to seed, or reuse when it is already seeded",
+    )
+    parser.add_argument("--json", help="also write the results here")
+    options = parser.parse_args()
+
+    database = options.database or os.path.join(
+        tempfile.gettempdir(),
+        f"attendees_bc-{options.scale:g}-{options.seed}.sqlite3",
+    )
+    os.environ.update(
+        DJANGO_SETTINGS_MODULE="benchmarks.settings",
+        BENCHMARK_DB=database,
+    )
+    django.setup()
+
+    from django.test import Client
+    from common.testing import benchmark_endpoints
+
+    seed_database(options.scale, options.seed)
+    print(f"database {database}, scale {options.scale:g}")
+    results, failures = benchmark_endpoints(
+        Client(), endpoints(), options.requests, options.warmup
+    )
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(
+                {
+                    "commit": git_commit(),
+                    "scale": options.scale,
+                    "seed": options.seed,
+                    "requests": options.requests,
+                    "endpoints": results,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
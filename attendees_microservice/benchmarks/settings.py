@@ -0,0 +1,20 @@
+"""
+Settings for the benchmarks. The database and the broker port come
+from the environment the benchmark sets up.
+"""
+import os
+
+from attendees_bc.settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get("BENCHMARK_DB", "benchmark.sqlite3"),
+    }
+}
+
+BROKER_HOST = "127.0.0.1"
+BROKER_PORT = int(os.environ.get("BENCHMARK_BROKER_PORT", "5672"))
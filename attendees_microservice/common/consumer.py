@@ -0,0 +1,238 @@
+import random
+import signal
+import threading
+import time
+import traceback
+
+import pika
+from pika.exceptions import AMQPError
+
+
+# bodies whose failures a worker remembers
+MAX_TRACKED_FAILURES = 10_000
+
+
+class Subscription:
+    """
+    A queue to consume and the function that handles its messages.
+
+    handle is called with a list of up to batch_size message bodies,
+    gathered for at most batch_wait seconds, and returns how many of
+    them, counting from the first, it dealt with (None means all of
+    them). Those are acked together and the rest go back to the queue.
+
+    When handle raises, the batch's messages are handled again one at a
+    time, so that one bad message doesn't hold back the others, and the
+    ones that fail go back to the queue. A message that has failed
+    max_failures times, with other messages getting through in between,
+    is rejected without requeueing: the broker dead-letters it through
+    the dead-letter exchange a policy gives the queue, or drops it when
+    there is none. Failures while nothing gets through, e.g. while the
+    database is down, don't count against a message.
+
+    When exchange is given the queue is bound to that fanout exchange.
+    """
+
+    def __init__(
+        self,
+        queue,
+        handle,
+        workers=1,
+        batch_size=100,
+        batch_wait=0.2,
+        exchange=None,
+        durable=False,
+        max_failures=5,
+    ):
+        self.queue = queue
+        self.handle = handle
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.exchange = exchange
+        self.durable = durable
+        self.max_failures = max_failures
+
+    def declare(self, channel):
+        channel.queue_declare(queue=self.queue, durable=self.durable)
+        if self.exchange:
+            channel.exchange_declare(
+                exchange=self.exchange,
+                exchange_type="fanout",
+            )
+            channel.queue_bind(exchange=self.exchange, queue=self.queue)
+
+
+class Backoff:
+    """
+    Exponential backoff with full jitter: the nth wait is a random time
+    between 0 and min(cap, base * 2 ** n) seconds.
+    """
+
+    def __init__(self, base=0.5, cap=30.0):
+        self.base = base
+        self.cap = cap
+        self.attempt = 0
+
+    def next(self):
+        delay = random.uniform(0, min(self.cap, self.base * 2**self.attempt))
+        self.attempt += 1
+        return delay
+
+    def reset(self):
+        self.attempt = 0
+
+
+class Worker(threading.Thread):
+    """
+    Consumes one subscription over its own connection and channel,
+    with a prefetch window of one batch.
+    """
+
+    def __init__(self, subscription, parameters, stopping, name):
+        super().__init__(name=name, daemon=True)
+        self.subscription = subscription
+        self.parameters = parameters
+        self.stopping = stopping
+        self.backoff = Backoff()
+        self.pending = []
+        # messages handled so far, and per requeued message body its
+        # counted failures and the value of handled at the last one
+        self.handled = 0
+        self.failures = {}
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                with pika.BlockingConnection(self.parameters) as connection:
+                    self.consume(connection)
+            except AMQPError as e:
+                # unacked messages are redelivered by the broker
+                self.pending = []
+                delay = self.backoff.next()
+                print(
+                    f"{self.name}: lost RabbitMQ ({e!r}), "
+                    f"reconnecting in {delay:.1f}s"
+                )
+                self.stopping.wait(delay)
+
+    def consume(self, connection):
+        subscription = self.subscription
+        channel = connection.channel()
+        subscription.declare(channel)
+        channel.basic_qos(prefetch_count=subscription.batch_size)
+        channel.basic_consume(
+            queue=subscription.queue,
+            on_message_callback=self.collect,
+        )
+        self.backoff.reset()
+        started = None
+        while not self.stopping.is_set():
+            connection.process_data_events(time_limit=subscription.batch_wait)
+            if not self.pending:
+                started = None
+                continue
+            if started is None:
+                started = time.monotonic()
+            if (
+                len(self.pending) >= subscription.batch_size
+                or time.monotonic() - started >= subscription.batch_wait
+            ):
+                self.flush(channel)
+                started = None
+        # shutting down: finish what was already delivered, then let
+        # the connection close hand anything later back to the queue
+        if self.pending:
+            self.flush(channel)
+
+    def collect(self, channel, method, properties, body):
+        self.pending.append((method.delivery_tag, body))
+
+    def flush(self, channel):
+        batch, self.pending = self.pending, []
+        try:
+            done = self.subscription.handle([body for _, body in batch])
+        except Exception:
+            traceback.print_exc()
+            if len(batch) == 1:
+                self.settle_failures(channel, batch)
+            else:
+                self.flush_one_by_one(channel, batch)
+            return
+        if done is None:
+            done = len(batch)
+        if done:
+            channel.basic_ack(delivery_tag=batch[done - 1][0], multiple=True)
+            self.handled += done
+            for _, body in batch[:done]:
+                self.failures.pop(body, None)
+        if done < len(batch):
+            channel.basic_nack(delivery_tag=batch[-1][0], multiple=True)
+            self.stopping.wait(self.backoff.next())
+        else:
+            self.backoff.reset()
+
+    def flush_one_by_one(self, channel, batch):
+        failed = []
+        for tag, body in batch:
+            try:
+                done = self.subscription.handle([body])
+            except Exception as e:
+                print(f"{self.name}: a message failed: {e!r}")
+                done = 0
+            if done is None or done:
+                channel.basic_ack(delivery_tag=tag)
+                self.handled += 1
+                self.failures.pop(body, None)
+            else:
+                failed.append((tag, body))
+        self.settle_failures(channel, failed)
+
+    def settle_failures(self, channel, failed):
+        if not failed:
+            self.backoff.reset()
+            return
+        for tag, body in failed:
+            failures, handled = self.failures.pop(body, (0, -1))
+            if self.handled > handled:
+                failures += 1
+            if failures >= self.subscription.max_failures:
+                print(
+                    f"{self.name}: dead-lettering a message that failed "
+                    f"{failures} times: {body!r}"
+                )
+                channel.basic_nack(delivery_tag=tag, requeue=False)
+                continue
+            self.failures[body] = (failures, self.handled)
+            if len(self.failures) > MAX_TRACKED_FAILURES:
+                # forget the message that failed longest ago
+                del self.failures[next(iter(self.failures))]
+            channel.basic_nack(delivery_tag=tag, requeue=True)
+        self.stopping.wait(self.backoff.next())
+
+
+def run(subscriptions, host, port=5672):
+    """
+    Runs subscription.workers worker threads for every subscription
+    until SIGTERM or SIGINT, then lets each finish and ack the batch
+    it has in hand before returning.
+    """
+    parameters = pika.ConnectionParameters(host=host, port=port)
+    stopping = threading.Event()
+    workers = [
+        Worker(subscription, parameters, stopping, f"{subscription.queue}-{n}")
+        for subscription in subscriptions
+        for n in range(subscription.workers)
+    ]
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for worker in workers:
+        worker.start()
+    while any(worker.is_alive() for worker in workers):
+        # join with a timeout so the main thread can take the signals
+        for worker in workers:
+            worker.join(timeout=0.5)
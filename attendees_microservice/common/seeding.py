@@ -0,0 +1,155 @@
+"""
+Deterministic sample data for the seed commands of the monolith and the
+attendees service. Both commands derive their rows from the same
+--scale and --seed, so the conferences and people they write line up
+without either service having to talk to the other.
+"""
+from datetime import datetime, timezone
+import itertools
+import random
+
+from django.core.management.color import no_style
+from django.db import connection
+
+
+# rows per unit of --scale
+SIZES = {
+    "locations": 200,
+    "conferences": 1_000,
+    "presentations": 10_000,
+    # the first "users" people are the monolith's users, and so the
+    # attendees service's accounts; attendees are drawn from all of them
+    "users": 10_000,
+    "people": 20_000,
+    "attendees": 100_000,
+}
+
+# seeded timestamps count from here, so that they repeat between runs
+EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+# fmt: off
+FIRST_NAMES = [
+    "Ada", "Alan", "Amara", "Ana", "Ben", "Carlos", "Chen", "Dana",
+    "Diego", "Elena", "Emeka", "Farah", "Grace", "Hana", "Ivan", "Jamal",
+    "Jin", "Kai", "Lena", "Leo", "Maya", "Mei", "Nadia", "Noah", "Omar",
+    "Priya", "Quinn", "Ravi", "Rosa", "Sam", "Sofia", "Tariq", "Uma",
+    "Victor", "Wen", "Yara", "Yusuf", "Zoe",
+]
+LAST_NAMES = [
+    "Abara", "Becker", "Castillo", "Dubois", "Eriksen", "Fischer",
+    "Garcia", "Haddad", "Ito", "Jensen", "Kowalski", "Lopez", "Mensah",
+    "Nakamura", "Okafor", "Patel", "Quintero", "Rossi", "Schmidt",
+    "Tanaka", "Usman", "Varga", "Wang", "Xu", "Yilmaz", "Zhang",
+]
+COMPANIES = [
+    "Acme", "Blue Harbor", "Brightline", "Cobalt Labs", "Datawise",
+    "Evergreen", "Fathom", "Granite", "Helix", "Ironwood", "Juniper",
+    "Keystone", "Lumen", "Northwind", "Orbital", "Pioneer", "Quartz",
+]
+TOPICS = [
+    "Python", "Django", "Cloud", "Data", "Security", "DevOps", "Frontend",
+    "Machine Learning", "Mobile", "Open Source", "Databases", "Testing",
+    "Accessibility", "Distributed Systems", "Product", "Design",
+]
+ADJECTIVES = [
+    "Annual", "Global", "Regional", "International", "Modern", "Applied",
+    "Practical", "Future", "Open", "United",
+]
+# fmt: on
+KINDS = ["Conference", "Summit", "Con", "Days", "Forum", "Symposium"]
+
+
+def sizes(scale):
+    return {name: max(1, round(n * scale)) for name, n in SIZES.items()}
+
+
+def conference_href(id):
+    # what the monolith's Conference.get_api_url() returns
+    return f"/api/conferences/{id}/"
+
+
+def conference_names(seed, count):
+    """
+    Yields (id, name) for the conferences with ids 1 to count.
+    """
+    rng = random.Random(f"{seed}:conferences")
+    for id in range(1, count + 1):
+        adjective = rng.choice(ADJECTIVES)
+        topic = rng.choice(TOPICS)
+        kind = rng.choice(KINDS)
+        yield id, f"{adjective} {topic} {kind} {id}"
+
+
+def people(seed, count):
+    """
+    Returns a list of count (first_name, last_name, email) tuples. The
+    emails are unique.
+    """
+    rng = random.Random(f"{seed}:people")
+    result = []
+    for n in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        result.append((first, last, f"{first}.{last}.{n}@example.com".lower()))
+    return result
+
+
+def bulk_insert(model, objects, batch_size):
+    """
+    Saves objects, which can be any iterable, with one bulk_create per
+    batch_size of them, and returns how many were saved.
+    """
+    objects = iter(objects)
+    count = 0
+    while True:
+        batch = list(itertools.islice(objects, batch_size))
+        if not batch:
+            return count
+        model.objects.bulk_create(batch)
+        count += len(batch)
+
+
+def insert_rows(model, fields, rows, batch_size):
+    """
+    Inserts rows, tuples of database-ready values for fields, with one
+    executemany per batch_size of them, and returns how many were
+    inserted. For the tables that grow to millions of rows this is
+    several times faster than bulk_insert, since bulk_create converts
+    every value through its field and sends at most 999 of them per
+    statement on SQLite.
+    """
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name).column for name in fields]
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(model._meta.db_table),
+        ", ".join(quote(column) for column in columns),
+        ", ".join(["%s"] * len(columns)),
+    )
+    rows = iter(rows)
+    count = 0
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                return count
+            cursor.executemany(sql, batch)
+            count += len(batch)
+
+
+def db_value(model, name, value):
+    """
+    Returns value as the database stores it in model's name field, for
+    the rows passed to insert_rows.
+    """
+    return model._meta.get_field(name).get_db_prep_save(value, connection)
+
+
+def reset_sequences(*models):
+    """
+    Moves the id sequences of models past the ids the seed wrote, as
+    loaddata does, on the databases that have sequences.
+    """
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
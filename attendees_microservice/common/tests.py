@@ -0,0 +1,231 @@
+import os
+import signal
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from . import consumer
+from .consumer import Backoff, Subscription, Worker
+
+
+class Channel:
+    """
+    Records the acks and nacks a worker sends.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def queue_declare(self, queue, durable):
+        pass
+
+    def basic_qos(self, prefetch_count):
+        pass
+
+    def basic_consume(self, queue, on_message_callback):
+        pass
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.calls.append(("ack", delivery_tag, multiple))
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        self.calls.append(("nack", delivery_tag, multiple, requeue))
+
+
+class Handler:
+    """
+    A subscription's handle: raises for the bodies in bad, and for every
+    body while down is true.
+    """
+
+    def __init__(self, bad=()):
+        self.bad = set(bad)
+        self.down = False
+        self.calls = []
+
+    def __call__(self, bodies):
+        self.calls.append(bodies)
+        if self.down or self.bad.intersection(bodies):
+            raise ValueError("bad message")
+
+
+class WorkerTests(SimpleTestCase):
+    """
+    Worker.flush and what it acks, requeues and dead-letters, against a
+    fake channel.
+    """
+
+    def setUp(self):
+        self.handle = Handler(bad=[b"bad"])
+        self.channel = Channel()
+        self.worker = Worker(
+            Subscription("queue", self.handle, max_failures=3),
+            parameters=None,
+            stopping=threading.Event(),
+            name="queue-0",
+        )
+        self.waits = self.enterContext(
+            mock.patch.object(self.worker.stopping, "wait")
+        )
+        self.enterContext(mock.patch("traceback.print_exc"))
+        self.enterContext(mock.patch("builtins.print"))
+        self.tags = iter(range(1, 1_000_000))
+
+    def flush(self, *bodies):
+        self.channel.calls = []
+        self.worker.pending = [(next(self.tags), body) for body in bodies]
+        self.worker.flush(self.channel)
+        return self.channel.calls
+
+    def test_batch_acked_at_once(self):
+        self.assertEqual(self.flush(b"a", b"b", b"c"), [("ack", 3, True)])
+        self.assertEqual(self.handle.calls, [[b"a", b"b", b"c"]])
+        self.waits.assert_not_called()
+
+    def test_partial_batch_requeues_the_rest(self):
+        self.worker.subscription.handle = lambda bodies: 1
+        self.assertEqual(
+            self.flush(b"a", b"b", b"c"),
+            [("ack", 1, True), ("nack", 3, True, True)],
+        )
+        self.waits.assert_called_once()
+
+    def test_failing_batch_is_retried_one_by_one(self):
+        calls = self.flush(b"a", b"bad", b"c")
+        self.assertEqual(
+            self.handle.calls, [[b"a", b"bad", b"c"], [b"a"], [b"bad"], [b"c"]]
+        )
+        self.assertEqual(
+            calls,
+            [
+                ("ack", 1, False),
+                ("ack", 3, False),
+                ("nack", 2, False, True),
+            ],
+        )
+        self.assertEqual(self.worker.failures, {b"bad": (1, 2)})
+        self.waits.assert_called_once()
+
+    def test_message_failing_among_others_is_dead_lettered(self):
+        for _ in range(2):
+            self.assertIn(
+                ("nack", mock.ANY, False, True), self.flush(b"ok", b"bad")
+            )
+        calls = self.flush(b"ok", b"bad")
+        self.assertEqual(calls[-1], ("nack", calls[-1][1], False, False))
+        self.assertEqual(self.worker.failures, {})
+
+    def test_failures_while_nothing_gets_through_dont_count(self):
+        self.handle.down = True
+        for _ in range(10):
+            (call,) = self.flush(b"a")
+            self.assertEqual(call[-1], True)
+        self.assertEqual(self.worker.failures[b"a"][0], 1)
+        for _ in range(10):
+            calls = self.flush(b"a", b"b")
+            self.assertTrue(all(call[-1] for call in calls))
+        self.assertEqual(self.worker.failures[b"a"][0], 1)
+        self.assertEqual(self.worker.failures[b"b"][0], 1)
+
+    def test_success_forgets_failures(self):
+        self.flush(b"ok", b"bad")
+        self.handle.bad = set()
+        self.assertEqual(self.flush(b"bad"), [("ack", 3, True)])
+        self.assertEqual(self.worker.failures, {})
+        self.waits.reset_mock()
+        self.flush(b"x")
+        self.waits.assert_not_called()
+
+    def test_tracked_failures_are_capped(self):
+        self.handle.bad = {b"bad1", b"bad2", b"bad3"}
+        with mock.patch.object(consumer, "MAX_TRACKED_FAILURES", 2):
+            self.flush(b"ok", b"bad1", b"bad2", b"bad3")
+        self.assertEqual(list(self.worker.failures), [b"bad2", b"bad3"])
+
+
+class BackoffTests(SimpleTestCase):
+    def test_waits_grow_to_the_cap_with_jitter(self):
+        backoff = Backoff(base=0.5, cap=4.0)
+        with mock.patch("random.uniform", side_effect=lambda a, b: b):
+            self.assertEqual(
+                [backoff.next() for _ in range(6)],
+                [0.5, 1.0, 2.0, 4.0, 4.0, 4.0],
+            )
+        for _ in range(100):
+            self.assertTrue(0 <= backoff.next() <= 4.0)
+
+    def test_reset(self):
+        backoff = Backoff(base=0.5)
+        backoff.next()
+        backoff.next()
+        backoff.reset()
+        with mock.patch("random.uniform", side_effect=lambda a, b: b):
+            self.assertEqual(backoff.next(), 0.5)
+
+
+class Connection:
+    """
+    Delivers the given bodies on the first process_data_events, and sets
+    stopping on the second, before the batch is due.
+    """
+
+    def __init__(self, worker, bodies):
+        self.worker = worker
+        self.bodies = bodies
+        self.channel_ = Channel()
+
+    def channel(self):
+        return self.channel_
+
+    def process_data_events(self, time_limit):
+        if self.bodies:
+            for tag, body in enumerate(self.bodies, 1):
+                method = mock.Mock(delivery_tag=tag)
+                self.worker.collect(self.channel_, method, None, body)
+            self.bodies = []
+        else:
+            self.worker.stopping.set()
+
+
+class ShutdownTests(SimpleTestCase):
+    def setUp(self):
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+
+    def test_batch_in_hand_is_acked_on_stop(self):
+        handle = mock.Mock(return_value=None)
+        worker = Worker(
+            Subscription("queue", handle, batch_size=10, batch_wait=60),
+            parameters=None,
+            stopping=threading.Event(),
+            name="queue-0",
+        )
+        connection = Connection(worker, [b"a", b"b"])
+        worker.consume(connection)
+        handle.assert_called_once_with([b"a", b"b"])
+        self.assertEqual(connection.channel_.calls, [("ack", 2, True)])
+
+    def test_sigterm_stops_every_worker(self):
+        stopped = []
+
+        class FakeWorker(threading.Thread):
+            def __init__(self, subscription, parameters, stopping, name):
+                super().__init__(name=name, daemon=True)
+                self.stopping = stopping
+
+            def run(self):
+                self.stopping.wait()
+                stopped.append(self.name)
+
+        subscriptions = [
+            Subscription("one", None, workers=2),
+            Subscription("two", None),
+        ]
+        with mock.patch.object(consumer, "Worker", FakeWorker):
+            timer = threading.Timer(
+                0.1, os.kill, (os.getpid(), signal.SIGTERM)
+            )
+            timer.start()
+            consumer.run(subscriptions, host="localhost")
+        self.assertCountEqual(stopped, ["one-0", "one-1", "two-0"])
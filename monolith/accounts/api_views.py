@@ -1,11 +1,12 @@
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 import json
-import pika
 
 from common.json import ModelEncoder
+from common.pagination import paginated_json_response
+from outbox.models import OutboxMessage
 from .models import User
 
 
@@ -24,18 +25,12 @@ class AccountInfoModelEncoder(ModelEncoder):
 
 
 def send_account_data(account):
-    parameters = pika.ConnectionParameters(host="rabbitmq")
-    connection = pika.BlockingConnection(parameters)
-    channel = connection.channel()
-    channel.exchange_declare(exchange="account_info", exchange_type="fanout")
-
+    """
+    Queues the account's info for the account_info exchange. Call it
+    in the transaction that saves the account.
+    """
     message = json.dumps(account, cls=AccountInfoModelEncoder)
-    channel.basic_publish(
-        exchange="account_info",
-        routing_key="",
-        body=message,
-    )
-    connection.close()
+    OutboxMessage.to_exchange("account_info", message)
 
 
 def create_user(json_content):
@@ -84,14 +79,17 @@ def create_user(json_content):
 def api_list_accounts(request):
     if request.method == "GET":
         users = User.objects.exclude(email="").filter(is_active=True)
-        return JsonResponse(
-            {"accounts": users},
-            encoder=AccountModelEncoder,
+        return paginated_json_response(
+            request,
+            "accounts",
+            users,
+            AccountModelEncoder,
         )
     else:
-        status_code, response_content, _ = create_user(request.body)
-        if status_code >= 200 and status_code < 300:
-            send_account_data(response_content)
+        with transaction.atomic():
+            status_code, response_content, _ = create_user(request.body)
+            if status_code >= 200 and status_code < 300:
+                send_account_data(response_content)
         response = JsonResponse(
             response_content,
             encoder=AccountModelEncoder,
@@ -140,11 +138,14 @@ def api_account_detail(request, email):
                     account.set_password(content["password"])
             status = 200
             response_content = account
+            with transaction.atomic():
+                account.save()
+                send_account_data(account)
         else:
-            status, response_content, account = create_user(request.body)
-        if account:
-            account.save()
-            send_account_data(account)
+            with transaction.atomic():
+                status, response_content, account = create_user(request.body)
+                if account:
+                    send_account_data(account)
         response = JsonResponse(
             response_content,
             encoder=AccountModelEncoder,
@@ -154,8 +155,9 @@ def api_account_detail(request, email):
         return response
     else:
         account.is_active = False
-        account.save()
-        send_account_data(account)
+        with transaction.atomic():
+            account.save()
+            send_account_data(account)
         response = HttpResponse()
         response.status_code = 204
         return response
@@ -0,0 +1,51 @@
+import json
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase
+from django.urls import reverse
+
+from outbox.models import OutboxMessage
+from .models import User
+
+
+ACCOUNT = {
+    "username": "ada",
+    "email": "ada@example.com",
+    "password": "secret",
+    "first_name": "Ada",
+    "last_name": "Lopez",
+}
+
+
+class AccountOutboxTests(TestCase):
+    """
+    An account is written exactly when its account_info event is.
+    """
+
+    def put(self):
+        url = reverse(
+            "api_account_detail", kwargs={"email": "ada@example.com"}
+        )
+        return self.client.put(
+            url, json.dumps(ACCOUNT), content_type="application/json"
+        )
+
+    def test_put_creates_account_and_event(self):
+        self.assertEqual(self.put().status_code, 200)
+        self.assertTrue(User.objects.filter(email="ada@example.com").exists())
+        message = OutboxMessage.objects.get(exchange="account_info")
+        self.assertEqual(json.loads(message.body)["email"], "ada@example.com")
+
+    def test_put_creates_no_account_without_event(self):
+        with mock.patch.object(
+            OutboxMessage, "to_exchange", side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                self.put()
+        self.assertFalse(User.objects.exists())
+
+    def test_put_conflict_queues_nothing(self):
+        User.objects.create_user(username="ada", email="other@example.com")
+        self.assertEqual(self.put().status_code, 409)
+        self.assertFalse(OutboxMessage.objects.exists())
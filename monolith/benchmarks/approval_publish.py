@@ -0,0 +1,117 @@
+"""
+Approvals per second through PUT /api/presentations/<id>/approval/,
+and messages per second from the outbox to the stand-in broker from
+benchmarks.broker through the relay_outbox command.
+
+The endpoints only write outbox rows, so they are timed without any
+broker traffic: first one PUT per approval, then the same number of
+approvals in a single PUT /api/presentations/decisions/. The relay is
+then timed draining what they wrote.
+
+Run from the monolith directory:
+
+    python -m benchmarks.approval_publish --requests 2000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import django
+
+from .broker import Broker
+
+
+def seed_database(count):
+    from django.core.management import call_command
+    from django.utils import timezone
+    from events.models import Conference, Location, State
+    from presentations.models import Presentation, Status
+
+    call_command("migrate", verbosity=0)
+    for name in ("SUBMITTED", "APPROVED", "REJECTED"):
+        Status.objects.create(name=name)
+    state = State.objects.create(name="Texas", abbreviation="TX")
+    location = Location.objects.create(
+        name="Convention Center", city="Austin", room_count=10, state=state
+    )
+    conference = Conference.objects.create(
+        name="Benchmark Conf",
+        starts=timezone.now(),
+        ends=timezone.now(),
+        description="",
+        max_presentations=count,
+        max_attendees=100,
+        location=location,
+    )
+    submitted = Status.objects.get(name="SUBMITTED")
+    Presentation.objects.bulk_create(
+        Presentation(
+            presenter_name=f"Presenter {i}",
+            presenter_email=f"presenter{i}@example.com",
+            title=f"Talk {i}",
+            synopsis="",
+            status=submitted,
+            conference=conference,
+        )
+        for i in range(count)
+    )
+    return list(Presentation.objects.values_list("id", flat=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    options = parser.parse_args()
+
+    broker = Broker().start()
+    os.environ.update(
+        DJANGO_SETTINGS_MODULE="benchmarks.settings",
+        BENCHMARK_DB=os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3"),
+        BENCHMARK_BROKER_PORT=str(broker.port),
+    )
+    django.setup()
+
+    from django.core.management import call_command
+    from django.test import Client
+    from outbox.models import OutboxMessage
+
+    ids = seed_database(options.requests * 2)
+    half = options.requests
+    single, bulk = ids[:half], ids[half:]
+    client = Client()
+    start = time.perf_counter()
+    for id in single:
+        response = client.put(f"/api/presentations/{id}/approval/")
+        assert response.status_code == 200, response.content
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'single':<8} {len(single) / elapsed:>8.0f} approvals/s "
+        f"({broker.published} messages published during requests)"
+    )
+
+    start = time.perf_counter()
+    response = client.put(
+        "/api/presentations/decisions/",
+        json.dumps({"status": "APPROVED", "presentations": bulk}),
+        content_type="application/json",
+    )
+    assert response.status_code == 200, response.content
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'bulk':<8} {len(bulk) / elapsed:>8.0f} approvals/s "
+        f"({elapsed * 1000:.0f} ms for the request)"
+    )
+
+    start = time.perf_counter()
+    call_command("relay_outbox", "--once")
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'relay':<8} {broker.published / elapsed:>8.0f} messages/s "
+        f"({OutboxMessage.objects.count()} left in the outbox)"
+    )
+
+
+if __name__ == "__main__":
+    main()
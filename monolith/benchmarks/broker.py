@@ -0,0 +1,396 @@
+"""
+A small in-process stand-in for RabbitMQ, good enough for pika clients
+doing what this project does: declaring queues and fanout/direct
+exchanges, publishing (optionally in tx or confirm mode), and consuming
+with basic.qos, acks, nacks and rejects. Frames are encoded and decoded
+with pika's own codec.
+
+Messages live in memory and are routed as soon as they are published,
+even inside a transaction; tx.commit only acknowledges. There is no
+authentication, persistence or heartbeating.
+"""
+import asyncio
+from collections import deque
+import concurrent.futures
+import itertools
+import threading
+
+from pika import frame, spec
+
+
+PROTOCOL_HEADER = b"AMQP\x00\x00\x09\x01"
+
+
+class Queue:
+    def __init__(self, name):
+        self.name = name
+        self.messages = deque()
+        self.consumers = []
+        self._next_consumer = 0
+
+    def next_consumer(self):
+        """
+        Returns a consumer whose channel can take another message,
+        going round-robin, or None.
+        """
+        for _ in range(len(self.consumers)):
+            consumer = self.consumers[
+                self._next_consumer % len(self.consumers)
+            ]
+            self._next_consumer += 1
+            if consumer.channel.can_deliver():
+                return consumer
+        return None
+
+
+class Consumer:
+    def __init__(self, tag, channel, queue, no_ack):
+        self.tag = tag
+        self.channel = channel
+        self.queue = queue
+        self.no_ack = no_ack
+
+
+class Channel:
+    def __init__(self, connection, number):
+        self.connection = connection
+        self.number = number
+        self.prefetch = 0
+        self.unacked = {}
+        self.delivery_tags = itertools.count(1)
+        self.confirm = False
+        self.publish_tags = itertools.count(1)
+        self.pending_publish = None
+
+    def can_deliver(self):
+        return not self.prefetch or len(self.unacked) < self.prefetch
+
+
+class Connection:
+    def __init__(self, broker, reader, writer):
+        self.broker = broker
+        self.reader = reader
+        self.writer = writer
+        self.channels = {}
+
+    def send(self, channel, method):
+        self.writer.write(frame.Method(channel, method).marshal())
+
+    def send_message(self, channel, method, properties, body):
+        self.send(channel, method)
+        self.writer.write(
+            frame.Header(channel, len(body), properties).marshal()
+        )
+        frame_max = self.broker.frame_max - 8
+        for start in range(0, len(body), frame_max):
+            end = start + frame_max
+            self.writer.write(frame.Body(channel, body[start:end]).marshal())
+
+    async def run(self):
+        header = await self.reader.readexactly(len(PROTOCOL_HEADER))
+        if header != PROTOCOL_HEADER:
+            self.writer.write(PROTOCOL_HEADER)
+            return
+        self.send(
+            0,
+            spec.Connection.Start(
+                server_properties={"product": "benchmark broker"},
+            ),
+        )
+        buffer = b""
+        while True:
+            data = await self.reader.read(65536)
+            if not data:
+                return
+            buffer += data
+            while True:
+                consumed, decoded = frame.decode_frame(buffer)
+                if not consumed:
+                    break
+                buffer = buffer[consumed:]
+                if self.handle(decoded) is False:
+                    await self.writer.drain()
+                    return
+            await self.writer.drain()
+
+    def handle(self, decoded):
+        if isinstance(decoded, frame.Heartbeat):
+            return
+        channel = self.channels.get(decoded.channel_number)
+        if isinstance(decoded, frame.Header):
+            channel.pending_publish[1] = decoded.properties
+            channel.pending_publish[2] = decoded.body_size
+            if decoded.body_size == 0:
+                self.finish_publish(channel)
+            return
+        if isinstance(decoded, frame.Body):
+            channel.pending_publish[3].append(decoded.fragment)
+            received = sum(len(f) for f in channel.pending_publish[3])
+            if received >= channel.pending_publish[2]:
+                self.finish_publish(channel)
+            return
+        return self.handle_method(decoded.channel_number, decoded.method)
+
+    def handle_method(self, number, method):
+        broker = self.broker
+        channel = self.channels.get(number)
+        if isinstance(method, spec.Connection.StartOk):
+            self.send(
+                0,
+                spec.Connection.Tune(
+                    channel_max=2047,
+                    frame_max=broker.frame_max,
+                    heartbeat=0,
+                ),
+            )
+        elif isinstance(method, spec.Connection.TuneOk):
+            pass
+        elif isinstance(method, spec.Connection.Open):
+            self.send(0, spec.Connection.OpenOk())
+        elif isinstance(method, spec.Connection.Close):
+            self.send(0, spec.Connection.CloseOk())
+            return False
+        elif isinstance(method, spec.Channel.Open):
+            self.channels[number] = Channel(self, number)
+            self.send(number, spec.Channel.OpenOk())
+        elif isinstance(method, spec.Channel.Close):
+            self.close_channel(number)
+            self.send(number, spec.Channel.CloseOk())
+        elif isinstance(method, spec.Channel.CloseOk):
+            self.close_channel(number)
+        elif isinstance(method, spec.Exchange.Declare):
+            broker.exchanges.setdefault(method.exchange, (method.type, []))
+            if not method.nowait:
+                self.send(number, spec.Exchange.DeclareOk())
+        elif isinstance(method, spec.Queue.Declare):
+            queue = broker.declare_queue(method.queue)
+            if not method.nowait:
+                self.send(
+                    number,
+                    spec.Queue.DeclareOk(
+                        queue=queue.name,
+                        message_count=len(queue.messages),
+                        consumer_count=len(queue.consumers),
+                    ),
+                )
+        elif isinstance(method, spec.Queue.Bind):
+            _, bindings = broker.exchanges.setdefault(
+                method.exchange, ("direct", [])
+            )
+            bindings.append((method.routing_key, method.queue))
+            if not method.nowait:
+                self.send(number, spec.Queue.BindOk())
+        elif isinstance(method, spec.Basic.Qos):
+            channel.prefetch = method.prefetch_count
+            self.send(number, spec.Basic.QosOk())
+        elif isinstance(method, spec.Basic.Consume):
+            tag = method.consumer_tag or f"ctag-{next(broker.tags)}"
+            queue = broker.declare_queue(method.queue)
+            queue.consumers.append(
+                Consumer(tag, channel, queue, method.no_ack)
+            )
+            if not method.nowait:
+                self.send(number, spec.Basic.ConsumeOk(consumer_tag=tag))
+            broker.dispatch(queue)
+        elif isinstance(method, spec.Basic.Cancel):
+            for queue in broker.queues.values():
+                queue.consumers = [
+                    c for c in queue.consumers if c.tag != method.consumer_tag
+                ]
+            if not method.nowait:
+                self.send(
+                    number,
+                    spec.Basic.CancelOk(consumer_tag=method.consumer_tag),
+                )
+        elif isinstance(method, spec.Basic.Publish):
+            channel.pending_publish = [method, None, 0, []]
+        elif isinstance(method, spec.Basic.Ack):
+            self.settle(channel, method.delivery_tag, method.multiple, None)
+        elif isinstance(method, spec.Basic.Nack):
+            self.settle(
+                channel, method.delivery_tag, method.multiple, method.requeue
+            )
+        elif isinstance(method, spec.Basic.Reject):
+            self.settle(channel, method.delivery_tag, False, method.requeue)
+        elif isinstance(method, spec.Tx.Select):
+            self.send(number, spec.Tx.SelectOk())
+        elif isinstance(method, spec.Tx.Commit):
+            self.send(number, spec.Tx.CommitOk())
+        elif isinstance(method, spec.Confirm.Select):
+            channel.confirm = True
+            if not method.nowait:
+                self.send(number, spec.Confirm.SelectOk())
+
+    def finish_publish(self, channel):
+        method, properties, _, fragments = channel.pending_publish
+        channel.pending_publish = None
+        self.broker.route(method, properties, b"".join(fragments))
+        if channel.confirm:
+            self.send(
+                channel.number,
+                spec.Basic.Ack(delivery_tag=next(channel.publish_tags)),
+            )
+
+    def settle(self, channel, delivery_tag, multiple, requeue):
+        if multiple:
+            tags = [
+                tag
+                for tag in channel.unacked
+                if tag <= delivery_tag or delivery_tag == 0
+            ]
+        else:
+            tags = [delivery_tag]
+        queues = set()
+        for tag in tags:
+            queue, message = channel.unacked.pop(tag)
+            if requeue:
+                queue.messages.appendleft(message)
+            else:
+                self.broker.acked += 1
+            queues.add(queue)
+        for queue in queues or self.broker.queues.values():
+            self.broker.dispatch(queue)
+
+    def close_channel(self, number):
+        channel = self.channels.pop(number, None)
+        if channel is None:
+            return
+        for queue in self.broker.queues.values():
+            queue.consumers = [
+                c for c in queue.consumers if c.channel is not channel
+            ]
+        # unacked messages go back to their queues, as in RabbitMQ
+        for queue, message in channel.unacked.values():
+            queue.messages.appendleft(message)
+            self.broker.dispatch(queue)
+
+    def close(self):
+        for number in list(self.channels):
+            self.close_channel(number)
+
+
+class Broker:
+    """
+    Run with start(), which serves on 127.0.0.1 from a daemon thread.
+    queue_depths() can be called from any thread.
+    """
+
+    frame_max = 131072
+
+    def __init__(self, port=0):
+        self.port = port
+        self.queues = {}
+        self.exchanges = {}
+        self.tags = itertools.count(1)
+        self.published = 0
+        self.acked = 0
+        self.loop = None
+
+    def start(self):
+        started = threading.Event()
+
+        def serve():
+            self.loop = asyncio.new_event_loop()
+            server = self.loop.run_until_complete(
+                asyncio.start_server(self.accept, "127.0.0.1", self.port)
+            )
+            self.port = server.sockets[0].getsockname()[1]
+            started.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=serve, daemon=True).start()
+        started.wait()
+        return self
+
+    def queue_depths(self):
+        """
+        Returns {queue: (ready, unacked)} for every queue, counted on the
+        broker's thread so that the queues don't change meanwhile.
+        """
+        if self.loop is None:
+            return {}
+        future = concurrent.futures.Future()
+
+        def count():
+            future.set_result(self.count_queues())
+
+        self.loop.call_soon_threadsafe(count)
+        return future.result()
+
+    def count_queues(self):
+        depths = {}
+        for name, queue in list(self.queues.items()):
+            unacked = 0
+            for consumer in queue.consumers:
+                unacked += sum(
+                    1
+                    for owner, _ in consumer.channel.unacked.values()
+                    if owner is queue
+                )
+            depths[name] = (len(queue.messages), unacked)
+        return depths
+
+    async def accept(self, reader, writer):
+        connection = Connection(self, reader, writer)
+        try:
+            await connection.run()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            connection.close()
+            writer.close()
+
+    def declare_queue(self, name):
+        if not name:
+            name = f"amq.gen-{next(self.tags)}"
+        if name not in self.queues:
+            self.queues[name] = Queue(name)
+        return self.queues[name]
+
+    def route(self, method, properties, body):
+        self.published += 1
+        message = (method.exchange, method.routing_key, properties, body)
+        if method.exchange == "":
+            targets = [method.routing_key]
+        else:
+            exchange_type, bindings = self.exchanges.get(
+                method.exchange, ("direct", [])
+            )
+            targets = [
+                queue
+                for key, queue in bindings
+                if exchange_type == "fanout" or key == method.routing_key
+            ]
+        for name in targets:
+            queue = self.queues.get(name)
+            if queue is not None:
+                queue.messages.append(message)
+                self.dispatch(queue)
+
+    def dispatch(self, queue):
+        while queue.messages:
+            consumer = queue.next_consumer()
+            if consumer is None:
+                return
+            exchange, routing_key, properties, body = queue.messages.popleft()
+            channel = consumer.channel
+            tag = next(channel.delivery_tags)
+            if consumer.no_ack:
+                self.acked += 1
+            else:
+                channel.unacked[tag] = (
+                    queue,
+                    (exchange, routing_key, properties, body),
+                )
+            channel.connection.send_message(
+                channel.number,
+                spec.Basic.Deliver(
+                    consumer_tag=consumer.tag,
+                    delivery_tag=tag,
+                    redelivered=False,
+                    exchange=exchange,
+                    routing_key=routing_key,
+                ),
+                properties,
+                body,
+            )
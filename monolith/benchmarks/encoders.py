@@ -0,0 +1,161 @@
+"""
+Rows per second ModelEncoder serializes, with the compiled
+serialization plans ("after") and with the per-row attribute lookups
+ModelEncoder.default did before them ("before"). The rows are unsaved
+model instances, so no database is involved, and both ways must produce
+the same JSON.
+
+Run from the monolith directory:
+
+    python -m benchmarks.encoders --rows 50000 --repeat 5
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import sys
+import time
+
+import django
+
+
+def per_row_default(encoder, o):
+    # ModelEncoder.default before the plans: the href, every property,
+    # nested encoder and extra data is looked up again for every row
+    d = {}
+    if hasattr(o, "get_api_url"):
+        d["href"] = o.get_api_url()
+    for property in encoder.properties:
+        value = getattr(o, property)
+        if property in encoder.encoders:
+            value = per_row_default(encoder.encoders[property], value)
+        d[property] = value
+    d.update(encoder.get_extra_data(o))
+    return d
+
+
+class PerRowEncoder:
+    def default(self, o):
+        if isinstance(o, self.model):
+            return per_row_default(self, o)
+        return super().default(o)
+
+
+def make_rows(count):
+    from events.models import Conference, Location, State
+    from presentations.models import Presentation, Status
+
+    starts = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    state = State(id=1, name="Texas", abbreviation="TX")
+    status = Status(id=1, name="SUBMITTED")
+    locations = [
+        Location(
+            id=id,
+            name=f"Convention Center {id}",
+            city="Austin",
+            room_count=10,
+            state=state,
+            created=starts,
+            updated=starts,
+        )
+        for id in range(1, 101)
+    ]
+    conferences = [
+        Conference(
+            id=id,
+            name=f"Conference {id}",
+            description="A conference.",
+            max_presentations=100,
+            max_attendees=1000,
+            starts=starts + timedelta(days=id % 365),
+            ends=starts + timedelta(days=id % 365 + 2),
+            created=starts,
+            updated=starts,
+            location=locations[id % len(locations)],
+        )
+        for id in range(1, count + 1)
+    ]
+    presentations = [
+        Presentation(
+            id=id,
+            title=f"Talk {id}",
+            presenter_name="Ada Lopez",
+            presenter_email="ada@example.com",
+            synopsis="A talk.",
+            created=starts,
+            status=status,
+            conference=conferences[id % len(conferences)],
+        )
+        for id in range(1, count + 1)
+    ]
+    return conferences, locations, presentations
+
+
+def compare(rows, before_encoder, after_encoder, repeat):
+    """
+    Encodes rows with both encoders repeat times, alternating between
+    them so that both see the same noise, and returns the best rows per
+    second of each and whether their JSON was the same.
+    """
+    best = {}
+    bodies = {}
+    for _ in range(repeat):
+        for encoder in (before_encoder, after_encoder):
+            start = time.perf_counter()
+            bodies[encoder] = json.dumps(rows, cls=encoder)
+            elapsed = time.perf_counter() - start
+            best[encoder] = min(best.get(encoder, elapsed), elapsed)
+    return (
+        len(rows) / best[before_encoder],
+        len(rows) / best[after_encoder],
+        bodies[before_encoder] == bodies[after_encoder],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    django.setup()
+
+    from events.api_views import (
+        ConferenceDetailEncoder,
+        ConferenceListEncoder,
+        LocationDetailEncoder,
+    )
+    from presentations.api_views import PresentationListEncoder
+
+    conferences, locations, presentations = make_rows(options.rows)
+    cases = [
+        (ConferenceListEncoder, conferences),
+        (ConferenceDetailEncoder, conferences),
+        (LocationDetailEncoder, locations * (options.rows // 100)),
+        (PresentationListEncoder, presentations),
+    ]
+    print(f"{'encoder':<28} {'before':>12} {'after':>12} {'speedup':>8}")
+    mismatches = []
+    for encoder, rows in cases:
+        before_encoder = type(encoder.__name__, (PerRowEncoder, encoder), {})
+        before, after, same = compare(
+            rows, before_encoder, encoder, options.repeat
+        )
+        if not same:
+            mismatches.append(encoder.__name__)
+        print(
+            f"{encoder.__name__:<28} {before:>8,.0f} r/s {after:>8,.0f} r/s "
+            f"{after / before:>7.2f}x"
+        )
+    for name in mismatches:
+        print(
+            f"{name}: the JSON differs between before and after",
+            file=sys.stderr,
+        )
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Latency, throughput and SQL queries of the monolith's GET endpoints,
+run through Django's test client against a database filled by the
+seed command. The weather and photo APIs are answered by the stub from
+benchmarks.stubs and RabbitMQ by the stand-in from benchmarks.broker.
+
+Every endpoint has a query budget in QUERY_BUDGETS, and the run exits
+with status 1 when one is exceeded. The seeded database is kept
+between runs, one per scale and seed, so that runs on different
+commits measure the same data; diff their --json files to compare.
+
+Run from the monolith directory:
+
+    python -m benchmarks.endpoints --scale 1 --requests 200 \\
+        --json endpoints.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import django
+
+from .broker import Broker
+from .stubs import start_upstream_stub
+
+
+# the most SQL queries one GET of each endpoint may run, whatever the
+# size of the page
+QUERY_BUDGETS = {
+    "api_list_conferences": 2,
+    "api_show_conference": 3,
+    "api_list_locations": 1,
+    "api_show_location": 2,
+    "api_list_presentations": 1,
+    "api_show_presentation": 2,
+    "api_list_accounts": 1,
+    "api_account_detail": 1,
+}
+
+# the limits the list endpoints are measured with
+PAGE_SIZES = [10, 100, 1000]
+
+
+def seed_database(scale, seed):
+    from django.core.management import call_command
+    from events.models import Conference
+
+    call_command("migrate", verbosity=0)
+    if not Conference.objects.exists():
+        call_command("seed", scale=scale, seed=seed)
+
+
+def endpoints():
+    """
+    Returns a (name, url, query budget) tuple per page size of every
+    list endpoint and for every detail endpoint.
+    """
+    from django.db.models import Count
+    from django.urls import reverse
+    from accounts.models import User
+    from events.models import Conference
+
+    # the conference with the most presentations gives the largest pages
+    conference = (
+        Conference.objects.annotate(count=Count("presentations"))
+        .order_by("-count")
+        .values_list("id", flat=True)
+        .first()
+    )
+    email = (
+        User.objects.filter(is_superuser=False)
+        .values_list("email", flat=True)
+        .first()
+    )
+    lists = [
+        ("api_list_conferences", {}),
+        ("api_list_locations", {}),
+        ("api_list_presentations", {"conference_id": conference}),
+        ("api_list_accounts", {}),
+    ]
+    details = [
+        ("api_show_conference", {"id": conference}),
+        ("api_show_location", {"id": 1}),
+        ("api_show_presentation", {"id": 1}),
+        ("api_account_detail", {"email": email}),
+    ]
+    cases = []
+    for name, kwargs in lists:
+        url = reverse(name, kwargs=kwargs)
+        for size in PAGE_SIZES:
+            cases.append(
+                (
+                    f"{name}?limit={size}",
+                    f"{url}?limit={size}",
+                    QUERY_BUDGETS[name],
+                )
+            )
+    for name, kwargs in details:
+        cases.append((name, reverse(name, kwargs=kwargs), QUERY_BUDGETS[name]))
+    return cases
+
+
+def git_commit():
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--database",
+        help="SQLite file to seed, or reuse when it is already seeded",
+    )
+    parser.add_argument("--json", help="also write the results here")
+    options = parser.parse_args()
+
+    database = options.database or os.path.join(
+        tempfile.gettempdir(),
+        f"conference_go-{options.scale:g}-{options.seed}.sqlite3",
+    )
+    _, upstream_url = start_upstream_stub(0)
+    broker = Broker().start()
+    os.environ.update(
+        DJANGO_SETTINGS_MODULE="benchmarks.settings",
+        BENCHMARK_DB=database,
+        BENCHMARK_UPSTREAM_URL=upstream_url,
+        BENCHMARK_BROKER_PORT=str(broker.port),
+    )
+    django.setup()
+
+    from django.test import Client
+    from common.testing import benchmark_endpoints
+
+    seed_database(options.scale, options.seed)
+    print(f"database {database}, scale {options.scale:g}")
+    results, failures = benchmark_endpoints(
+        Client(), endpoints(), options.requests, options.warmup
+    )
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(
+                {
+                    "commit": git_commit(),
+                    "scale": options.scale,
+                    "seed": options.seed,
+                    "requests": options.requests,
+                    "endpoints": results,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Load benchmark for GET /api/conferences/<id>/ with a slow weather
+upstream, comparing the sync deployment (gunicorn sync workers, sync
+views) with the async one (one uvicorn worker, async views). The
+unpaginated GET /api/conferences/ is measured too, since under ASGI
+a list body is streamed through the request's sync thread (see
+common.asgi). A response only counts when its body is complete JSON.
+
+Run from the monolith directory:
+
+    python -m benchmarks.load_conference_detail --delay 0.2 \\
+        --concurrency 50 --requests 1000 --sync-workers 4
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import django
+import requests
+
+from common.testing import percentile
+from .stubs import start_upstream_stub
+
+
+def seed_database(list_rows):
+    from django.core.management import call_command
+    from django.utils import timezone
+    from events.models import Conference, Location, State
+
+    call_command("migrate", verbosity=0)
+    state = State.objects.create(name="Texas", abbreviation="TX")
+    location = Location.objects.create(
+        name="Convention Center",
+        city="Austin",
+        room_count=10,
+        state=state,
+        latitude=30.27,
+        longitude=-97.74,
+    )
+    conferences = Conference.objects.bulk_create(
+        Conference(
+            name=f"Benchmark Conf {n}",
+            starts=timezone.now(),
+            ends=timezone.now(),
+            description="",
+            max_presentations=10,
+            max_attendees=100,
+            location=location,
+        )
+        for n in range(list_rows)
+    )
+    return Conference.objects.get(name=conferences[0].name).id
+
+
+def start_server(mode, port, sync_workers, env):
+    if mode == "sync":
+        args = ["-w", str(sync_workers), "conference_go.wsgi"]
+    else:
+        args = [
+            "-w",
+            "1",
+            "-k",
+            "uvicorn.workers.UvicornWorker",
+            "conference_go.asgi",
+        ]
+    env = dict(env, BENCHMARK_ASYNC="1" if mode == "async" else "0")
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--timeout",
+            "120",
+            *args,
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/api/upstreams/"
+    for _ in range(100):
+        if server.poll() is not None:
+            break
+        try:
+            requests.get(url, timeout=5)
+            return server
+        except requests.RequestException:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def run_load(url, concurrency, total):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=60)
+            # a body cut off after the status line was sent is an error
+            response.json()
+            ok = response.status_code == 200
+        except (requests.RequestException, ValueError):
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = [seconds for seconds, ok in results if ok]
+    if not latencies:
+        latencies = [float("nan")]
+    return {
+        "requests": total,
+        "errors": sum(1 for _, ok in results if not ok),
+        "seconds": elapsed,
+        "throughput": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--delay", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--sync-workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--list-rows",
+        type=int,
+        default=500,
+        help="conferences in the list endpoint's response",
+    )
+    parser.add_argument("--json", help="also write the results here")
+    options = parser.parse_args()
+
+    _, upstream_url = start_upstream_stub(options.delay)
+    database = os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3")
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE="benchmarks.settings",
+        BENCHMARK_DB=database,
+        BENCHMARK_UPSTREAM_URL=upstream_url,
+    )
+    os.environ.update(env)
+    django.setup()
+    conference_id = seed_database(options.list_rows)
+    endpoints = {
+        "detail": f"/api/conferences/{conference_id}/",
+        "list": "/api/conferences/",
+    }
+
+    results = {}
+    for mode in ("sync", "async"):
+        server = start_server(mode, options.port, options.sync_workers, env)
+        try:
+            for endpoint, path in endpoints.items():
+                url = f"http://127.0.0.1:{options.port}{path}"
+                # warm up
+                run_load(url, options.concurrency, options.concurrency)
+                results[f"{mode} {endpoint}"] = run_load(
+                    url, options.concurrency, options.requests
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(
+        f"upstream delay {options.delay * 1000:.0f} ms, "
+        f"concurrency {options.concurrency}, "
+        f"sync workers {options.sync_workers}, async workers 1, "
+        f"{options.list_rows} conferences listed"
+    )
+    print(f"{'run':<13} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} errors")
+    for run, result in results.items():
+        print(
+            f"{run:<13} {result['throughput']:>8.1f} "
+            f"{result['p50_ms']:>6.0f}ms {result['p95_ms']:>6.0f}ms "
+            f"{result['p99_ms']:>6.0f}ms {result['errors']}"
+        )
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Emails per second from the presentation mailer into the SMTP sink from
+benchmarks.smtp, with the sink's greeting delayed to stand in for a
+remote mail server's connection setup.
+
+"send_mail" is what the mailer used to do for every message: send_mail
+over a new SMTP connection. "consumer" runs presentation_workflow's
+consumer.py against the stand-in broker from benchmarks.broker, once
+per --workers count of approval workers, and times it from the first
+publish to the last email reaching the sink.
+
+Run from the monolith directory:
+
+    python -m benchmarks.mailer --emails 1000 --greeting-delay 0.02 \\
+        --sink-delay 0.005 --workers 1 4 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import django
+from django.conf import settings
+import pika
+
+from .broker import Broker
+from .smtp import SmtpSink
+
+
+WORKFLOW_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "..", "presentation_workflow"
+)
+
+
+def approval(i):
+    return json.dumps(
+        {
+            "presenter_name": f"Presenter {i}",
+            "presenter_email": f"presenter{i}@example.com",
+            "title": f"Talk {i}",
+        }
+    )
+
+
+def time_send_mail(sink, count, workers):
+    from django.core.mail import send_mail
+
+    start = time.perf_counter()
+    for i in range(count):
+        send_mail(
+            "Your presentation has been accepted",
+            "body",
+            "admin@conference.go",
+            [f"presenter{i}@example.com"],
+            fail_silently=False,
+        )
+    return time.perf_counter() - start
+
+
+def start_mailer(sink, broker, workers):
+    """
+    Starts presentation_workflow's consumer.py against sink and broker
+    and returns its process.
+    """
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE="benchmarks.mailer_settings",
+        # the mailer's own common package must come before the
+        # monolith's, which is only here for benchmarks.mailer_settings
+        PYTHONPATH=os.pathsep.join(
+            [WORKFLOW_DIR, os.path.dirname(os.path.dirname(__file__))]
+        ),
+        BENCHMARK_SMTP_PORT=str(sink.port),
+        BENCHMARK_BROKER_PORT=str(broker.port),
+        BENCHMARK_MAILER_WORKERS=str(workers),
+    )
+    return subprocess.Popen(
+        [sys.executable, os.path.join("presentation_mailer", "consumer.py")],
+        cwd=WORKFLOW_DIR,
+        env=env,
+    )
+
+
+def time_consumer(sink, count, workers):
+    broker = Broker().start()
+    consumer = start_mailer(sink, broker, workers)
+    try:
+        while "presentation_rejections" not in broker.queues:
+            if consumer.poll() is not None:
+                raise RuntimeError("the mailer exited")
+            time.sleep(0.05)
+        parameters = pika.ConnectionParameters("127.0.0.1", broker.port)
+        with pika.BlockingConnection(parameters) as connection:
+            channel = connection.channel()
+            received = sink.received
+            start = time.perf_counter()
+            for i in range(count):
+                channel.basic_publish(
+                    "", "presentation_approvals", approval(i)
+                )
+            while sink.received - received < count:
+                if consumer.poll() is not None:
+                    raise RuntimeError("the mailer exited")
+                time.sleep(0.01)
+            return time.perf_counter() - start
+    finally:
+        consumer.terminate()
+        consumer.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--emails", type=int, default=1000)
+    parser.add_argument("--greeting-delay", type=float, default=0.02)
+    parser.add_argument("--sink-delay", type=float, default=0.005)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    options = parser.parse_args()
+
+    sink = SmtpSink(
+        greeting_delay=options.greeting_delay,
+        data_delay=options.sink_delay,
+    ).start()
+    settings.configure(EMAIL_HOST="127.0.0.1", EMAIL_PORT=sink.port)
+    django.setup()
+
+    print(
+        f"greeting delay {options.greeting_delay * 1000:.0f} ms, "
+        f"per-email delay {options.sink_delay * 1000:.0f} ms"
+    )
+    runs = [("send_mail", time_send_mail, 1)] + [
+        (f"consumer x{workers}", time_consumer, workers)
+        for workers in options.workers
+    ]
+    for mode, run, workers in runs:
+        connections = sink.connections
+        elapsed = run(sink, options.emails, workers)
+        print(
+            f"{mode:<12} {options.emails / elapsed:>8.0f} emails/s "
+            f"over {sink.connections - connections} SMTP connections"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Settings for running presentation_workflow's mailer against the
+stand-ins from this package; see benchmarks.mailer.
+"""
+import os
+
+from presentation_mailer.settings import *  # noqa: F401,F403
+
+
+EMAIL_HOST = "127.0.0.1"
+EMAIL_PORT = int(os.environ["BENCHMARK_SMTP_PORT"])
+BROKER_HOST = "127.0.0.1"
+BROKER_PORT = int(os.environ["BENCHMARK_BROKER_PORT"])
+CONSUMER_QUEUES = {
+    "presentation_approvals": {
+        "workers": int(os.environ.get("BENCHMARK_MAILER_WORKERS", "1")),
+        "batch_size": 20,
+    },
+    "presentation_rejections": {"workers": 1, "batch_size": 20},
+}
@@ -0,0 +1,434 @@
+"""
+End-to-end latency of the two message pipelines, on one machine:
+
+- approvals: PUT /api/presentations/<id>/approval/, the outbox relay,
+  the presentation_approvals queue and presentation_workflow's mailer,
+  timed until the email reaches the SMTP sink from benchmarks.smtp;
+- accounts: POST /api/accounts/, the outbox relay, the account_info
+  fanout and the attendees service's account_info_consumer, timed
+  until the AccountVO row is committed, as seen by polling its table.
+
+The monolith runs under gunicorn and RabbitMQ is the stand-in from
+benchmarks.broker. Requests are sent open loop at each of --rates per
+second for --duration seconds, and latencies count from when a request
+was due rather than from when a client thread got to send it, so that
+a backed up client doesn't hide the queueing. Meanwhile the outbox and
+the queue are sampled for their depth. The sweep stops at the first
+rate the pipeline can't keep up with: a request failed or was never
+delivered, or deliveries came in at less than 90% of the rate.
+
+Run from the monolith directory:
+
+    python -m benchmarks.pipeline approvals --rates 25 50 100 200
+    python -m benchmarks.pipeline accounts --rates 5 10 20 40
+"""
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import django
+import requests
+
+from common.testing import percentile
+from .approval_publish import seed_database
+from .broker import Broker
+from .load_conference_detail import start_server
+from .mailer import start_mailer
+from .smtp import SmtpSink
+
+
+MONOLITH_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ATTENDEES_DIR = os.path.join(MONOLITH_DIR, "..", "attendees_microservice")
+
+
+def wait_for(ready, process, what):
+    for _ in range(200):
+        if ready():
+            return
+        if process.poll() is not None:
+            raise RuntimeError(f"{what} exited")
+        time.sleep(0.05)
+    raise RuntimeError(f"{what} did not start")
+
+
+class Approvals:
+    """
+    Approving presentations, through to the approval emails. Requests
+    are (presenter email, presentation id), and every presentation has
+    its own presenter email.
+    """
+
+    queue = "presentation_approvals"
+
+    def __init__(self, options, broker, directory):
+        self.options = options
+        self.broker = broker
+        self.sink = SmtpSink(
+            greeting_delay=options.greeting_delay,
+            data_delay=options.sink_delay,
+        ).start()
+
+    def prepare(self, count):
+        from presentations.models import Presentation
+
+        seed_database(count)
+        return list(
+            Presentation.objects.order_by("id").values_list(
+                "presenter_email", "id"
+            )
+        )
+
+    def start_consumer(self):
+        mailer = start_mailer(
+            self.sink, self.broker, self.options.mailer_workers
+        )
+        wait_for(
+            lambda: "presentation_rejections" in self.broker.queues,
+            mailer,
+            "the mailer",
+        )
+        return mailer
+
+    def send(self, session, url, request):
+        _, id = request
+        return session.put(
+            f"{url}/api/presentations/{id}/approval/", timeout=60
+        )
+
+    def delivered(self):
+        return dict(self.sink.delivered)
+
+
+class Accounts:
+    """
+    Creating accounts, through to their AccountVO rows in the attendees
+    service. Requests are (email, number).
+    """
+
+    queue = "attendees_account_info"
+
+    def __init__(self, options, broker, directory):
+        self.broker = broker
+        self.database = os.path.join(directory, "attendees.sqlite3")
+        self.env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE="benchmarks.settings",
+            PYTHONPATH=ATTENDEES_DIR,
+            BENCHMARK_DB=self.database,
+            BENCHMARK_BROKER_PORT=str(broker.port),
+        )
+        self.committed = {}
+
+    def prepare(self, count):
+        from django.core.management import call_command
+
+        call_command("migrate", verbosity=0)
+        subprocess.run(
+            [sys.executable, "manage.py", "migrate", "--verbosity", "0"],
+            cwd=ATTENDEES_DIR,
+            env=self.env,
+            check=True,
+        )
+        return [(f"load{n}@example.com", n) for n in range(count)]
+
+    def start_consumer(self):
+        consumer = subprocess.Popen(
+            [
+                sys.executable,
+                os.path.join("attendees", "account_info_consumer.py"),
+            ],
+            cwd=ATTENDEES_DIR,
+            env=self.env,
+        )
+
+        def bound():
+            _, bindings = self.broker.exchanges.get("account_info", ("", []))
+            return any(queue == self.queue for _, queue in bindings)
+
+        wait_for(bound, consumer, "account_info_consumer")
+        threading.Thread(target=self.watch, daemon=True).start()
+        return consumer
+
+    def watch(self):
+        connection = sqlite3.connect(self.database, timeout=5)
+        last = 0
+        while True:
+            try:
+                rows = connection.execute(
+                    "SELECT id, email FROM attendees_accountvo WHERE id > ?",
+                    (last,),
+                ).fetchall()
+            except sqlite3.OperationalError:
+                rows = []
+            seen = time.monotonic()
+            for id, email in rows:
+                self.committed.setdefault(email, seen)
+                last = max(last, id)
+            time.sleep(0.005)
+
+    def send(self, session, url, request):
+        email, n = request
+        return session.post(
+            f"{url}/api/accounts/",
+            json={
+                "username": f"load{n}",
+                "email": email,
+                "password": "password",
+                "first_name": "Load",
+                "last_name": f"Test {n}",
+            },
+            timeout=60,
+        )
+
+    def delivered(self):
+        return dict(self.committed)
+
+
+PIPELINES = {"approvals": Approvals, "accounts": Accounts}
+
+
+def sample_depths(broker, database, queue, interval, stopping, samples):
+    """
+    Appends (seconds, outbox rows, messages in the queue) to samples
+    every interval until stopping is set.
+    """
+    connection = sqlite3.connect(database, timeout=5)
+    start = time.monotonic()
+    while not stopping.wait(interval):
+        try:
+            (outbox,) = connection.execute(
+                "SELECT COUNT(*) FROM outbox_outboxmessage"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            continue
+        ready, unacked = broker.queue_depths().get(queue, (0, 0))
+        samples.append(
+            (round(time.monotonic() - start, 2), outbox, ready + unacked)
+        )
+    connection.close()
+
+
+def drive(pipeline, url, batch, rate, concurrency):
+    """
+    Sends batch at rate requests per second and returns {key: (due,
+    outcome)}, where due is when the request should have been sent and
+    outcome is the response status or the exception sending it raised.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    start = time.monotonic() + 0.1
+    sent = {}
+
+    def one(n, request):
+        due = start + n / rate
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            outcome = pipeline.send(session, url, request).status_code
+        except requests.RequestException as e:
+            outcome = type(e).__name__
+        sent[request[0]] = (due, outcome)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for n, request in enumerate(batch):
+            pool.submit(one, n, request)
+    return sent
+
+
+def run_rate(pipeline, url, batch, rate, broker, options):
+    samples = []
+    stopping = threading.Event()
+    sampler = threading.Thread(
+        target=sample_depths,
+        args=(
+            broker,
+            os.environ["BENCHMARK_DB"],
+            pipeline.queue,
+            options.sample_interval,
+            stopping,
+            samples,
+        ),
+    )
+    sampler.start()
+    sent = drive(pipeline, url, batch, rate, options.concurrency)
+    accepted = [key for key, (_, outcome) in sent.items() if outcome == 200]
+    deadline = time.monotonic() + options.drain_timeout
+    while time.monotonic() < deadline:
+        delivered = pipeline.delivered()
+        if all(key in delivered for key in accepted):
+            break
+        time.sleep(0.05)
+    stopping.set()
+    sampler.join()
+
+    delivered = pipeline.delivered()
+    done = [key for key in accepted if key in delivered]
+    latencies = [delivered[key] - sent[key][0] for key in done]
+    # deliveries come in over about --duration seconds while the
+    # pipeline keeps up, and spread out further once it can't
+    times = [delivered[key] for key in done] or [0]
+    first, last = min(times), max(times)
+    result = {
+        "rate": rate,
+        "requests": len(batch),
+        "errors": len(batch) - len(accepted),
+        "error_outcomes": dict(
+            Counter(str(o) for _, o in sent.values() if o != 200)
+        ),
+        "delivered": len(done),
+        "delivered_per_s": len(done) / max(last - first, 1 / rate),
+        "p50_ms": (percentile(latencies, 50) or 0) * 1000,
+        "p95_ms": (percentile(latencies, 95) or 0) * 1000,
+        "p99_ms": (percentile(latencies, 99) or 0) * 1000,
+        "max_outbox": max((outbox for _, outbox, _ in samples), default=0),
+        "max_queue": max((queue for _, _, queue in samples), default=0),
+        # (seconds, outbox rows, messages in the queue)
+        "depths": samples,
+    }
+    result["saturated"] = (
+        result["errors"] > 0
+        or result["delivered"] < len(batch)
+        or result["delivered_per_s"] < 0.9 * rate
+    )
+    return result
+
+
+def print_depths(samples, points=20):
+    step = max(1, len(samples) // points)
+    shown = samples[::step]
+    print(f"{'':>8} seconds {' '.join(f'{s:>5.1f}' for s, _, _ in shown)}")
+    print(f"{'':>8} outbox  {' '.join(f'{o:>5}' for _, o, _ in shown)}")
+    print(f"{'':>8} queue   {' '.join(f'{q:>5}' for _, _, q in shown)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("pipeline", choices=PIPELINES)
+    parser.add_argument(
+        "--rates", type=float, nargs="+", default=[10, 20, 40, 80]
+    )
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument(
+        "--warmup",
+        type=float,
+        default=2,
+        help="seconds of requests at the first rate before measuring",
+    )
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--server-workers", type=int, default=4)
+    parser.add_argument("--mailer-workers", type=int, default=4)
+    parser.add_argument("--relay-interval", type=float, default=0.5)
+    parser.add_argument("--greeting-delay", type=float, default=0.02)
+    parser.add_argument("--sink-delay", type=float, default=0.005)
+    parser.add_argument("--sample-interval", type=float, default=0.25)
+    parser.add_argument("--drain-timeout", type=float, default=30)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="also write the results here")
+    options = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    broker = Broker().start()
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE="benchmarks.settings",
+        BENCHMARK_DB=os.path.join(directory, "monolith.sqlite3"),
+        BENCHMARK_BROKER_PORT=str(broker.port),
+    )
+    os.environ.update(env)
+    django.setup()
+
+    pipeline = PIPELINES[options.pipeline](options, broker, directory)
+    batches = [round(rate * options.duration) for rate in options.rates]
+    warmup = round(options.rates[0] * options.warmup)
+    pending = pipeline.prepare(warmup + sum(batches))
+    processes = []
+    try:
+        processes.append(pipeline.start_consumer())
+        processes.append(
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "manage.py",
+                    "relay_outbox",
+                    "--interval",
+                    str(options.relay_interval),
+                ],
+                cwd=MONOLITH_DIR,
+                env=env,
+            )
+        )
+        processes.append(
+            start_server("sync", options.port, options.server_workers, env)
+        )
+        url = f"http://127.0.0.1:{options.port}"
+        # the first requests of every worker fill its caches and open
+        # its connections; what they measure is left out
+        batch, pending = pending[:warmup], pending[warmup:]
+        run_rate(pipeline, url, batch, options.rates[0], broker, options)
+
+        print(
+            f"{options.pipeline}: {options.server_workers} gunicorn "
+            f"workers, relay interval {options.relay_interval:g}s, "
+            f"{options.duration:g}s per rate"
+        )
+        print(
+            f"{'rate':>8} {'done/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+            f"{'outbox':>7} {'queue':>7} errors"
+        )
+        results = []
+        saturation = None
+        for rate, count in zip(options.rates, batches):
+            batch, pending = pending[:count], pending[count:]
+            result = run_rate(pipeline, url, batch, rate, broker, options)
+            results.append(result)
+            print(
+                f"{rate:>8g} {result['delivered_per_s']:>8.1f} "
+                f"{result['p50_ms']:>6.0f}ms {result['p95_ms']:>6.0f}ms "
+                f"{result['p99_ms']:>6.0f}ms {result['max_outbox']:>7} "
+                f"{result['max_queue']:>7} {result['errors']} "
+                + " ".join(
+                    f"{outcome}x{n}"
+                    for outcome, n in result["error_outcomes"].items()
+                )
+            )
+            print_depths(result["depths"])
+            if result["saturated"]:
+                saturation = rate
+                break
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    sustained = [r["rate"] for r in results if not r["saturated"]]
+    if saturation is None:
+        print(f"kept up with every rate up to {sustained[-1]:g}/s")
+    else:
+        kept_up = f"{sustained[-1]:g}/s" if sustained else "none"
+        print(f"saturated at {saturation:g}/s; highest rate kept up {kept_up}")
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(
+                {
+                    "pipeline": options.pipeline,
+                    "saturation": saturation,
+                    "rates": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
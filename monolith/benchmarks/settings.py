@@ -0,0 +1,33 @@
+"""
+Settings for the servers the benchmarks start. The database and the
+upstream URL come from the environment the benchmark sets up.
+"""
+import os
+
+from conference_go.settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get("BENCHMARK_DB", "benchmark.sqlite3"),
+    }
+}
+
+PEXELS_API_URL = os.environ.get("BENCHMARK_UPSTREAM_URL", "")
+OPEN_WEATHER_API_URL = os.environ.get("BENCHMARK_UPSTREAM_URL", "")
+
+BROKER_HOST = "127.0.0.1"
+BROKER_PORT = int(os.environ.get("BENCHMARK_BROKER_PORT", "5672"))
+
+# make every request go to the upstream stub
+WEATHER_CACHE_TTL = 0
+WEATHER_CACHE_STALE_TTL = 0
+
+# an async worker can only have as many upstream calls in flight as its
+# connection pool allows
+ACL_HTTP_POOL_SIZE = 100
+
+ASYNC_READ_VIEWS = os.environ.get("BENCHMARK_ASYNC") == "1"
@@ -0,0 +1,85 @@
+"""
+A small in-process SMTP sink, in the spirit of MailHog: it accepts every
+message and keeps only counts. greeting_delay is added before the 220
+greeting of each new connection, to stand in for the TCP, TLS and AUTH
+round trips a real mail server costs per connection, and data_delay
+before accepting each message, for the server's own processing.
+"""
+import asyncio
+import threading
+import time
+
+
+class SmtpSink:
+    """
+    Run with start(), which serves on 127.0.0.1 from a daemon thread.
+    delivered maps every recipient to the time.monotonic() at which the
+    last message to them was accepted.
+    """
+
+    def __init__(self, port=0, greeting_delay=0.0, data_delay=0.0):
+        self.port = port
+        self.greeting_delay = greeting_delay
+        self.data_delay = data_delay
+        self.connections = 0
+        self.received = 0
+        self.recipients = []
+        self.delivered = {}
+
+    def start(self):
+        started = threading.Event()
+
+        def serve():
+            loop = asyncio.new_event_loop()
+            server = loop.run_until_complete(
+                asyncio.start_server(self.accept, "127.0.0.1", self.port)
+            )
+            self.port = server.sockets[0].getsockname()[1]
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=serve, daemon=True).start()
+        started.wait()
+        return self
+
+    async def accept(self, reader, writer):
+        self.connections += 1
+        try:
+            await asyncio.sleep(self.greeting_delay)
+            writer.write(b"220 sink ESMTP\r\n")
+            recipients = []
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                command = line[:4].upper()
+                if command in (b"EHLO", b"HELO"):
+                    writer.write(b"250 sink\r\n")
+                elif command == b"RCPT":
+                    recipients.append(line[8:].strip(b" <>\r\n").decode())
+                    writer.write(b"250 OK\r\n")
+                elif command == b"DATA":
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    while await reader.readline() not in (b".\r\n", b""):
+                        pass
+                    await asyncio.sleep(self.data_delay)
+                    self.received += 1
+                    self.recipients.extend(recipients)
+                    accepted = time.monotonic()
+                    for recipient in recipients:
+                        self.delivered[recipient] = accepted
+                    recipients = []
+                    writer.write(b"250 OK\r\n")
+                elif command == b"QUIT":
+                    writer.write(b"221 Bye\r\n")
+                    await writer.drain()
+                    return
+                else:
+                    # MAIL, RSET, NOOP
+                    recipients = [] if command == b"RSET" else recipients
+                    writer.write(b"250 OK\r\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,45 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+
+class UpstreamStubHandler(BaseHTTPRequestHandler):
+    """
+    Answers like the Pexels and OpenWeatherMap endpoints events.acls
+    calls, after sleeping server.delay seconds.
+    """
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        if self.path.startswith("/geo/"):
+            content = [{"lat": 30.27, "lon": -97.74}]
+        elif self.path.startswith("/data/"):
+            content = {
+                "name": "Austin",
+                "main": {"temp": 75.0},
+                "weather": [{"description": "clear sky"}],
+            }
+        else:
+            content = {"photos": [{"src": {"original": "http://x/1.jpg"}}]}
+        body = json.dumps(content).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_upstream_stub(delay, port=0):
+    """
+    Starts the stub in a daemon thread and returns (server, base URL).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), UpstreamStubHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
@@ -0,0 +1,194 @@
+import asyncio
+import threading
+import time
+
+
+class StaleWhileRevalidateCache:
+    """
+    An in-process cache where each entry is fresh for ttl seconds and
+    may then be served stale for stale_ttl more seconds while a
+    background thread reloads it. Only a miss, or an entry older than
+    ttl + stale_ttl, makes the caller wait for the loader, and callers
+    that miss the same key at the same time share one load.
+    """
+
+    def __init__(self, ttl, stale_ttl):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = {}
+        self._refreshing = set()
+        self._loading = {}
+        self._aloading = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced_misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+
+    def get(self, key, load):
+        value, state = self._lookup(key)
+        if state == "stale":
+            self._refresh_in_background(key, load)
+        if state != "miss":
+            return value
+        with self._lock:
+            flight = self._loading.get(key)
+            if flight is None:
+                flight = self._loading[key] = _Flight()
+                leader = True
+            else:
+                self._counters["coalesced_misses"] += 1
+                leader = False
+        if not leader:
+            return flight.wait()
+        try:
+            value = load()
+            self._entries[key] = (value, time.monotonic())
+            flight.value = value
+            return value
+        except BaseException as e:
+            # the callers waiting on this load get the same error, and
+            # nothing is cached
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._loading[key]
+            flight.done.set()
+
+    async def aget(self, key, load):
+        """
+        Like get(), for a load that returns an awaitable. Stale entries
+        are refreshed by a task on the running event loop.
+        """
+        value, state = self._lookup(key)
+        if state == "stale":
+            self._refresh_in_task(key, load)
+        if state != "miss":
+            return value
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._aloading.get(key)
+            if task is not None and task.get_loop() is loop:
+                self._counters["coalesced_misses"] += 1
+            else:
+                task = loop.create_task(self._aload(key, load))
+                self._aloading[key] = task
+                task.add_done_callback(
+                    lambda task: self._finish_aload(key, task)
+                )
+        # a caller that gives up, e.g. on a timeout, doesn't cancel the
+        # load the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _aload(self, key, load):
+        value = await load()
+        self._entries[key] = (value, time.monotonic())
+        return value
+
+    def _finish_aload(self, key, task):
+        with self._lock:
+            if self._aloading.get(key) is task:
+                del self._aloading[key]
+        if not task.cancelled():
+            # retrieved here, so an error nobody waited for isn't logged
+            # as never retrieved
+            task.exception()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats["size"] = len(self._entries)
+        return stats
+
+    def clear(self):
+        self._entries.clear()
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, loaded_at = entry
+            age = time.monotonic() - loaded_at
+            if age < self.ttl:
+                self._count("hits")
+                return value, "fresh"
+            if age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                return value, "stale"
+        self._count("misses")
+        return None, "miss"
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _refresh_in_background(self, key, load):
+        if not self._start_refresh(key):
+            return
+        thread = threading.Thread(
+            target=self._refresh,
+            args=(key, load),
+            daemon=True,
+        )
+        thread.start()
+
+    def _start_refresh(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _refresh_in_task(self, key, load):
+        if self._start_refresh(key):
+            task = asyncio.get_running_loop().create_task(
+                self._arefresh(key, load)
+            )
+            # the loop only keeps weak references to its tasks
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _arefresh(self, key, load):
+        try:
+            value = await load()
+            self._entries[key] = (value, time.monotonic())
+            self._count("refreshes")
+        except Exception:
+            self._count("refresh_errors")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh(self, key, load):
+        try:
+            value = load()
+            self._entries[key] = (value, time.monotonic())
+            self._count("refreshes")
+        except Exception:
+            # keep serving the stale value; the next stale hit retries
+            self._count("refresh_errors")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+class _Flight:
+    """
+    One load of a key that several get() callers wait on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
@@ -0,0 +1,196 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from common.timing import record
+
+
+class CircuitOpenError(requests.RequestException):
+    """
+    Raised instead of calling an upstream whose circuit is open, so
+    callers that already handle requests errors fail fast for free.
+
+    It is a requests error even for UpstreamClient.aget, which uses
+    httpx: aget raises httpx's errors as requests errors too, so that
+    the sync and async callers share one set of handlers.
+    """
+
+
+async def _close_at_shutdown(client):
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+def close_at_shutdown(client):
+    """
+    Has the running event loop close client as it shuts down:
+    asyncio.run(), and so async_to_sync and the ASGI servers, close the
+    async generators still open on their loop, and this one then runs
+    client.aclose() on the loop that owns its connections. Keep the
+    returned generator, as the loop only holds it weakly.
+    """
+    closer = _close_at_shutdown(client)
+    try:
+        closer.asend(None).send(None)
+    except StopIteration:
+        pass
+    return closer
+
+
+class UpstreamClient:
+    """
+    A per-process HTTP client for one third-party API. It keeps a pooled
+    keep-alive Session, applies (connect, read) timeouts to every call
+    and wraps the upstream in a circuit breaker.
+
+    aget makes the same calls through an httpx.AsyncClient, one per
+    event loop, and raises requests errors like get does.
+
+    The circuit opens after failure_threshold consecutive failures
+    (connection errors, timeouts or 5xx responses). Calls then raise
+    CircuitOpenError without touching the network. After reset_timeout
+    seconds, one trial call is let through: success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name,
+        timeout,
+        pool_size=10,
+        failure_threshold=5,
+        reset_timeout=30,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool_size = pool_size
+        # event loop -> (AsyncClient, the generator that closes it)
+        self._async_clients = {}
+
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._metrics = {
+            "requests": 0,
+            "failures": 0,
+            "short_circuits": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+        }
+
+    def get(self, url, **kwargs):
+        self._before_call()
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.get(url, **kwargs)
+            if response.status_code >= 500:
+                response.raise_for_status()
+            failed = False
+        finally:
+            self._after_call(time.perf_counter() - start, failed=failed)
+        return response
+
+    async def aget(self, url, **kwargs):
+        self._before_call()
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = await self.async_client.get(url, **kwargs)
+            if response.status_code >= 500:
+                raise requests.HTTPError(
+                    f"{response.status_code} from {self.name}"
+                )
+            failed = False
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e)) from e
+        finally:
+            # also when the call is cancelled, e.g. by the caller's
+            # timeout: that counts as a failure, and must end a trial
+            # call so the circuit can't stay half-open for good
+            self._after_call(time.perf_counter() - start, failed=failed)
+        return response
+
+    @property
+    def async_client(self):
+        # an AsyncClient's connections belong to the event loop that
+        # opened them, so every loop gets a client of its own. Under an
+        # ASGI server that is one loop for the life of the process;
+        # other loops, such as async_to_sync's, close theirs as they
+        # shut down.
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._async_clients:
+                for other in list(self._async_clients):
+                    if other.is_closed():
+                        del self._async_clients[other]
+                connect, read = self.timeout
+                client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(read, connect=connect),
+                    limits=httpx.Limits(
+                        max_connections=self.pool_size,
+                        max_keepalive_connections=self.pool_size,
+                    ),
+                )
+                self._async_clients[loop] = (client, close_at_shutdown(client))
+            return self._async_clients[loop][0]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            if self._opened_at is None:
+                stats["state"] = "closed"
+            elif self._trial_in_flight:
+                stats["state"] = "half-open"
+            else:
+                stats["state"] = "open"
+        if stats["requests"]:
+            stats["mean_seconds"] = stats["total_seconds"] / stats["requests"]
+        else:
+            stats["mean_seconds"] = None
+        return stats
+
+    def _before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_timeout or self._trial_in_flight:
+                self._metrics["short_circuits"] += 1
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            self._trial_in_flight = True
+
+    def _after_call(self, seconds, failed):
+        record(f"acl-{self.name}", seconds)
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._metrics["total_seconds"] += seconds
+            self._metrics["max_seconds"] = max(
+                self._metrics["max_seconds"], seconds
+            )
+            if failed:
+                self._metrics["failures"] += 1
+                self._consecutive_failures += 1
+                if (
+                    self._trial_in_flight
+                    or self._consecutive_failures >= self.failure_threshold
+                ):
+                    self._opened_at = time.monotonic()
+            else:
+                self._consecutive_failures = 0
+                self._opened_at = None
+            self._trial_in_flight = False
@@ -0,0 +1,119 @@
+import os
+import threading
+
+import pika
+from pika.exceptions import AMQPError
+
+from common.timing import timed
+
+
+class Publisher:
+    """
+    Publishes to RabbitMQ over one long-lived connection and channel per
+    worker process instead of a new connection per message.
+
+    The connection is opened lazily on the first publish and re-opened
+    after the broker drops it (or after a fork), and queue and exchange
+    declarations are only sent once per connection.
+
+    With confirms=True the channel is put in transaction mode and every
+    publish call ends with one tx.commit, which returns once the broker
+    has taken all of the call's messages. pika's BlockingChannel waits
+    for each publisher confirm separately, so this is how a batch gets
+    confirmed in a single round trip. Without confirms a publish is
+    retried once on a fresh connection if the broker went away, which
+    can deliver a message twice.
+    """
+
+    def __init__(self, host, port=5672, confirms=False):
+        self.parameters = pika.ConnectionParameters(host=host, port=port)
+        self.confirms = confirms
+        self._lock = threading.Lock()
+        self._pid = None
+        self._connection = None
+        self._channel = None
+        self._declared = set()
+
+    def publish_to_queue(self, queue, *bodies):
+        """
+        Sends each body to the named queue through the default exchange.
+        """
+        self._publish(("queue", queue), "", queue, bodies)
+
+    def publish_to_exchange(
+        self, exchange, *bodies, exchange_type="fanout", routing_key=""
+    ):
+        self._publish(
+            ("exchange", exchange, exchange_type),
+            exchange,
+            routing_key,
+            bodies,
+        )
+
+    def close(self):
+        with self._lock:
+            self._reset()
+
+    def _publish(self, declaration, exchange, routing_key, bodies):
+        with timed("broker"), self._lock:
+            for attempt in range(2):
+                try:
+                    channel = self._get_channel()
+                    if declaration not in self._declared:
+                        self._declare(channel, declaration)
+                        self._declared.add(declaration)
+                    for body in bodies:
+                        channel.basic_publish(
+                            exchange=exchange,
+                            routing_key=routing_key,
+                            body=body,
+                        )
+                    if self.confirms:
+                        channel.tx_commit()
+                    return
+                except AMQPError:
+                    self._reset()
+                    if attempt == 1:
+                        raise
+
+    def _get_channel(self):
+        if self._pid != os.getpid():
+            # the connection was inherited from the parent process and
+            # belongs to it; never touch it here
+            self._connection = None
+            self._channel = None
+            self._pid = os.getpid()
+        if self._connection is None or self._connection.is_closed:
+            self._connection = pika.BlockingConnection(self.parameters)
+            self._channel = None
+            self._declared.clear()
+        if self._channel is None or self._channel.is_closed:
+            self._channel = self._connection.channel()
+            self._declared.clear()
+            if self.confirms:
+                self._channel.tx_select()
+        return self._channel
+
+    def _declare(self, channel, declaration):
+        if declaration[0] == "queue":
+            channel.queue_declare(queue=declaration[1])
+        else:
+            channel.exchange_declare(
+                exchange=declaration[1],
+                exchange_type=declaration[2],
+            )
+
+    def _reset(self):
+        connection = self._connection
+        self._connection = None
+        self._channel = None
+        self._declared.clear()
+        if (
+            connection is not None
+            and connection.is_open
+            and self._pid == os.getpid()
+        ):
+            try:
+                connection.close()
+            except AMQPError:
+                pass
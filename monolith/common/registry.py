@@ -0,0 +1,104 @@
+from functools import partial
+import threading
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+
+class ValueObjectRegistry:
+    """
+    An in-process copy of a small value-object table, such as Status or
+    State, indexed by id and the given unique fields. The whole table is
+    read on first use. Rows this process saves or deletes are updated
+    in place once their transaction commits.
+
+    A lookup that misses reads just that row from the database, so rows
+    added by other processes are found; changes other processes make to
+    rows already held are not seen until invalidate() is called or the
+    process restarts. Bulk writes skip the model signals, so call
+    invalidate() after them.
+
+    The instances handed out are shared, so treat them as read-only.
+    """
+
+    def __init__(self, model, *fields):
+        self.model = model
+        self.fields = ("id", *fields)
+        self._indexes = None
+        self._lock = threading.Lock()
+        label = model._meta.label
+        post_save.connect(
+            self._saved,
+            sender=model,
+            weak=False,
+            dispatch_uid=f"registry-save-{label}",
+        )
+        post_delete.connect(
+            self._deleted,
+            sender=model,
+            weak=False,
+            dispatch_uid=f"registry-delete-{label}",
+        )
+
+    def get(self, **lookup):
+        """
+        Like model.objects.get() with a single field lookup; raises
+        model.DoesNotExist when there is no such row.
+        """
+        ((field, value),) = lookup.items()
+        if field == "pk":
+            field = "id"
+        try:
+            value = self.model._meta.get_field(field).to_python(value)
+        except ValidationError:
+            value = None
+        instance = self._load()[field].get(value)
+        if instance is None and value is not None:
+            instance = self.model.objects.filter(**{field: value}).first()
+            if instance is not None:
+                self._store(instance)
+        if instance is None:
+            raise self.model.DoesNotExist(
+                f"{self.model.__name__} matching {lookup} does not exist."
+            )
+        return instance
+
+    def invalidate(self):
+        self._indexes = None
+
+    def _load(self):
+        indexes = self._indexes
+        if indexes is None:
+            with self._lock:
+                indexes = self._indexes
+                if indexes is None:
+                    rows = list(self.model.objects.all())
+                    indexes = {
+                        field: {getattr(row, field): row for row in rows}
+                        for field in self.fields
+                    }
+                    self._indexes = indexes
+        return indexes
+
+    def _saved(self, instance, **kwargs):
+        transaction.on_commit(partial(self._store, instance))
+
+    def _deleted(self, instance, **kwargs):
+        transaction.on_commit(partial(self._discard, instance.id))
+
+    def _store(self, instance):
+        self._discard(instance.id)
+        with self._lock:
+            if self._indexes is not None:
+                for field, index in self._indexes.items():
+                    index[getattr(instance, field)] = instance
+
+    def _discard(self, id):
+        with self._lock:
+            if self._indexes is None:
+                return
+            old = self._indexes["id"].get(id)
+            if old is not None:
+                for field, index in self._indexes.items():
+                    index.pop(getattr(old, field), None)
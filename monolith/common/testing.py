@@ -0,0 +1,120 @@
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def count_queries(client, url):
+    """
+    Returns the number of SQL queries a GET of url runs, including the
+    ones a streaming response runs while its body is consumed. Raises
+    AssertionError when the GET doesn't answer 200, since an error
+    response runs no queries and would pass any budget.
+    """
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+    if response.status_code != 200:
+        raise AssertionError(f"GET {url} answered {response.status_code}")
+    return len(context)
+
+
+def assert_constant_queries(client, url, add_rows):
+    """
+    GETs url, calls add_rows() to grow the tables behind it, then GETs
+    url again. Raises AssertionError when the second request ran a
+    different number of queries, i.e. when the endpoint has an N+1.
+    """
+    before = count_queries(client, url)
+    add_rows()
+    after = count_queries(client, url)
+    if before != after:
+        raise AssertionError(
+            f"GET {url} ran {before} queries, then {after} after "
+            "more rows were added"
+        )
+    return after
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def measure(client, url, requests, warmup=10):
+    """
+    GETs url warmup times, then times requests more GETs one after
+    another. Returns the latency percentiles, the throughput, the size
+    of the response body and the number of SQL queries a GET runs,
+    which is counted in a separate request so that capturing the
+    queries doesn't show up in the timings, and is None when the GET
+    doesn't answer 200.
+    """
+
+    def get():
+        response = client.get(url)
+        if response.streaming:
+            body = b"".join(response.streaming_content)
+        else:
+            body = response.content
+        return response.status_code, len(body)
+
+    for _ in range(warmup):
+        get()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        sent = time.perf_counter()
+        status, size = get()
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - start
+    return {
+        "status": status,
+        "bytes": size,
+        "queries": count_queries(client, url) if status == 200 else None,
+        "requests": requests,
+        "throughput": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def benchmark_endpoints(client, endpoints, requests, warmup=10):
+    """
+    Measures every endpoint, a (name, url, query budget) tuple, and
+    prints a line for each. Returns the results by name and a list of
+    failures: the endpoints that didn't answer 200 or ran more queries
+    than their budget.
+    """
+    results = {}
+    failures = []
+    print(
+        f"{'endpoint':<36} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+        f"{'queries':>9} {'bytes':>9}"
+    )
+    for name, url, budget in endpoints:
+        result = measure(client, url, requests, warmup)
+        result["url"] = url
+        result["query_budget"] = budget
+        results[name] = result
+        queries = result["queries"]
+        print(
+            f"{name:<36} {result['throughput']:>8.0f} "
+            f"{result['p50_ms']:>6.1f}ms {result['p95_ms']:>6.1f}ms "
+            f"{result['p99_ms']:>6.1f}ms "
+            f"{'-' if queries is None else queries:>4} / {budget:<2} "
+            f"{result['bytes']:>9}"
+        )
+        if result["status"] != 200:
+            failures.append(f"{name}: GET {url} answered {result['status']}")
+        elif queries > budget:
+            failures.append(
+                f"{name}: GET {url} ran {result['queries']} queries, "
+                f"over its budget of {budget}"
+            )
+    return results, failures
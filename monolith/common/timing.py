@@ -0,0 +1,195 @@
+"""
+Per-request timings: how long a request spent in SQL, in calls to
+upstream APIs, publishing messages and encoding JSON. Code that does
+one of these wraps it in timed(name), which costs next to nothing when
+no request is being timed. ServerTimingMiddleware reports the totals in
+a Server-Timing response header, and prints a JSON line with the
+slowest SQL for requests slower than SLOW_REQUEST_SECONDS.
+
+The middleware is listed in MIDDLEWARE but does nothing unless
+SERVER_TIMING is true.
+"""
+from collections import defaultdict
+from contextvars import ContextVar
+import json
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+# statements kept per request for the slow-request log
+MAX_QUERIES = 1000
+SLOW_QUERIES_LOGGED = 5
+
+_current = ContextVar("timings", default=None)
+
+
+class Timings:
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.queries = []
+
+    def add(self, name, seconds):
+        self.seconds[name] += seconds
+        self.counts[name] += 1
+
+    def header(self, total):
+        metrics = []
+        for name, seconds in self.seconds.items():
+            count = self.counts[name]
+            metrics.append(f'{name};dur={seconds * 1000:.1f};desc="{count}x"')
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+class timed:
+    """
+    Adds the time spent in the with block to the current request's
+    timings under name.
+    """
+
+    __slots__ = ("name", "timings", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.add(self.name, time.perf_counter() - self.start)
+
+
+def record(name, seconds):
+    """
+    Adds seconds, measured by the caller, to the current request's
+    timings under name.
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def record_query(execute, sql, params, many, context):
+    # installed on every connection by ServerTimingMiddleware
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - start
+        timings.add("db", seconds)
+        if len(timings.queries) < MAX_QUERIES:
+            timings.queries.append((seconds, sql))
+
+
+def install_query_wrapper(sender=None, connection=None, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class ServerTimingMiddleware:
+    """
+    Times each request and adds a Server-Timing header such as
+
+        db;dur=4.2;desc="3x", json;dur=1.1;desc="1x", total;dur=9.8
+
+    A streaming response's header only covers the work done before the
+    view returned, since the header is sent before the body is encoded;
+    the slow-request log covers the whole response.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SERVER_TIMING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.SLOW_REQUEST_SECONDS
+        # connections opened later by any thread get the wrapper when
+        # they connect
+        connection_created.connect(install_query_wrapper)
+        for connection in connections.all():
+            install_query_wrapper(connection=connection)
+
+    def __call__(self, request):
+        timings = Timings()
+        start = time.perf_counter()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        response["Server-Timing"] = timings.header(time.perf_counter() - start)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, timings, request, response, start
+            )
+        else:
+            self.log_if_slow(timings, request, response, start)
+        return response
+
+    def stream(self, content, timings, request, response, start):
+        content = iter(content)
+        try:
+            while True:
+                token = _current.set(timings)
+                try:
+                    chunk = next(content, None)
+                finally:
+                    _current.reset(token)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.log_if_slow(timings, request, response, start)
+
+    def log_if_slow(self, timings, request, response, start):
+        total = time.perf_counter() - start
+        if total < self.threshold:
+            return
+        # statements grouped by their text, so that one run a hundred
+        # times shows up as one entry
+        by_sql = defaultdict(lambda: [0.0, 0])
+        for seconds, sql in timings.queries:
+            entry = by_sql[sql]
+            entry[0] += seconds
+            entry[1] += 1
+        worst = sorted(by_sql.items(), key=lambda item: -item[1][0])
+        print(
+            json.dumps(
+                {
+                    "slow_request": {
+                        "method": request.method,
+                        "path": request.get_full_path(),
+                        "status": response.status_code,
+                        "ms": round(total * 1000, 1),
+                        "timings": {
+                            name: {
+                                "ms": round(seconds * 1000, 1),
+                                "count": timings.counts[name],
+                            }
+                            for name, seconds in timings.seconds.items()
+                        },
+                        "sql": [
+                            {
+                                "ms": round(seconds * 1000, 1),
+                                "runs": runs,
+                                "statement": sql,
+                            }
+                            for sql, (seconds, runs) in worst[
+                                :SLOW_QUERIES_LOGGED
+                            ]
+                        ],
+                    }
+                }
+            ),
+            flush=True,
+        )
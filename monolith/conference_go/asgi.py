@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from common.asgi import StreamingASGIHandler
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "conference_go.settings")
 
-application = get_asgi_application()
+# get_asgi_application(), with a handler that streams list bodies
+django.setup(set_prefix=False)
+application = StreamingASGIHandler()
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     "accounts.apps.AccountsConfig",
     "events.apps.EventsConfig",
     "presentations.apps.PresentationsConfig",
+    "outbox.apps.OutboxConfig",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -50,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "common.timing.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -131,3 +133,52 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# RabbitMQ. Views write their messages to the outbox app, and the
+# relay_outbox command publishes them through common.publisher.
+
+BROKER_HOST = "rabbitmq"
+BROKER_PORT = 5672
+
+
+# Third-party APIs used by events.acls
+
+PEXELS_API_URL = "https://api.pexels.com"
+OPEN_WEATHER_API_URL = "https://api.openweathermap.org"
+
+# Every upstream gets a pooled keep-alive session with (connect, read)
+# timeouts in seconds, and a circuit breaker that opens after
+# ACL_CIRCUIT_FAILURE_THRESHOLD consecutive failures and lets a trial
+# call through after ACL_CIRCUIT_RESET_TIMEOUT seconds
+
+ACL_HTTP_TIMEOUT = (3.05, 5)
+ACL_HTTP_POOL_SIZE = 10
+ACL_CIRCUIT_FAILURE_THRESHOLD = 5
+ACL_CIRCUIT_RESET_TIMEOUT = 30
+
+# The async views give all of a request's upstream calls this many
+# seconds in total before answering without them
+
+ACL_ASYNC_BUDGET = 2.0
+
+# Route the read endpoints that call upstreams to their async views
+# when served by an ASGI server; under WSGI they keep using the sync
+# views
+
+ASYNC_READ_VIEWS = True
+
+# Weather is fresh for WEATHER_CACHE_TTL seconds, then served stale for
+# up to WEATHER_CACHE_STALE_TTL more seconds while it is refreshed in
+# the background
+
+WEATHER_CACHE_TTL = 10 * 60
+WEATHER_CACHE_STALE_TTL = 60 * 60
+
+# Set SERVER_TIMING to add a Server-Timing header with the time spent in
+# SQL, upstream calls, publishing and JSON encoding to every response,
+# and to print a JSON line with the worst SQL of each request slower
+# than SLOW_REQUEST_SECONDS
+
+SERVER_TIMING = False
+SLOW_REQUEST_SECONDS = 0.5
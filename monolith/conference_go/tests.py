@@ -0,0 +1,224 @@
+from datetime import datetime, timezone
+import base64
+import itertools
+import json
+
+from asgiref.sync import async_to_sync
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import SimpleTestCase, TestCase
+from django.urls import get_script_prefix, reverse, set_script_prefix
+
+from accounts.models import User
+from common.asgi import StreamingASGIHandler
+from common.json import compile_href
+from common.testing import assert_constant_queries
+from events.models import Conference, Location, State
+from presentations.models import Presentation, Status
+
+
+STARTS = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+ids = itertools.count(1)
+
+
+class ListEndpointQueriesTests(TestCase):
+    """
+    Every list endpoint, streamed and paged, runs the same number of
+    queries however many rows it lists.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.state = State.objects.create(name="Texas", abbreviation="TX")
+        cls.statuses = [
+            Status.objects.create(id=id, name=name)
+            for id, name in enumerate(["SUBMITTED", "APPROVED"], 1)
+        ]
+        cls.location = cls.add_location()
+        cls.conference = cls.add_conference()
+
+    @classmethod
+    def add_location(cls):
+        n = next(ids)
+        return Location.objects.create(
+            name=f"Convention Center {n}",
+            city="Austin",
+            room_count=10,
+            state=cls.state,
+        )
+
+    @classmethod
+    def add_conference(cls):
+        n = next(ids)
+        return Conference.objects.create(
+            name=f"Conference {n}",
+            starts=STARTS,
+            ends=STARTS,
+            description="A conference.",
+            max_presentations=10,
+            max_attendees=100,
+            location=cls.add_location(),
+        )
+
+    def add_presentation(self):
+        n = next(ids)
+        return Presentation.objects.create(
+            presenter_name=f"Presenter {n}",
+            presenter_email=f"presenter{n}@example.com",
+            title=f"Talk {n}",
+            synopsis="A talk.",
+            status=self.statuses[n % len(self.statuses)],
+            conference=self.conference,
+        )
+
+    def add_user(self):
+        n = next(ids)
+        return User.objects.create(
+            username=f"user{n}",
+            email=f"user{n}@example.com",
+        )
+
+    def assert_list_constant(self, url, add_row):
+        def add_rows():
+            for _ in range(5):
+                add_row()
+
+        for query in ["", "?limit=3"]:
+            with self.subTest(url=url + query):
+                add_row()
+                assert_constant_queries(self.client, url + query, add_rows)
+
+    def test_list_conferences(self):
+        self.assert_list_constant(
+            reverse("api_list_conferences"), self.add_conference
+        )
+
+    def test_list_locations(self):
+        self.assert_list_constant(
+            reverse("api_list_locations"), self.add_location
+        )
+
+    def test_list_presentations(self):
+        self.assert_list_constant(
+            reverse(
+                "api_list_presentations",
+                kwargs={"conference_id": self.conference.id},
+            ),
+            self.add_presentation,
+        )
+
+    def test_list_accounts(self):
+        self.assert_list_constant(reverse("api_list_accounts"), self.add_user)
+
+
+class CompileHrefTests(SimpleTestCase):
+    """
+    The href a serialization plan builds is the model's get_api_url().
+    """
+
+    def test_same_as_get_api_url(self):
+        self.addCleanup(set_script_prefix, get_script_prefix())
+        for model in [Conference, Location, Presentation]:
+            href = compile_href(model)
+            for prefix in ["/", "/conference go/"]:
+                set_script_prefix(prefix)
+                for id in [1, 42, 10**12]:
+                    with self.subTest(model=model, prefix=prefix, id=id):
+                        o = model(id=id)
+                        self.assertEqual(href(o), o.get_api_url())
+
+    def test_models_without_a_route_name(self):
+        class Model:
+            id = 1
+
+            def get_api_url(self):
+                return "/somewhere/"
+
+        self.assertEqual(compile_href(Model)(Model()), "/somewhere/")
+
+
+class CursorTests(TestCase):
+    """
+    A cursor that doesn't decode to values of the keyset's fields is a
+    400, however it was tampered with.
+    """
+
+    def test_invalid_cursor(self):
+        url = reverse("api_list_conferences")
+        cursors = [
+            "not base64!",
+            base64.urlsafe_b64encode(b"{").decode(),
+            base64.urlsafe_b64encode(b"[1, 2]").decode(),
+            # the keyset is starts, name, id
+            base64.urlsafe_b64encode(b'[5, "x", 1]').decode(),
+            base64.urlsafe_b64encode(b'["2023-01-01", "x", "y"]').decode(),
+            base64.urlsafe_b64encode(b"[[], {}, null]").decode(),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(url, {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    response.json(), {"message": "Invalid limit or cursor"}
+                )
+
+
+class StreamingASGIHandlerTests(TestCase):
+    """
+    Under StreamingASGIHandler an unpaginated list is streamed, with the
+    rows read in the request's sync thread rather than on the loop.
+    """
+
+    def setUp(self):
+        # as the test client does, so that the handler's request signals
+        # don't close the test's connection
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+    def get(self, path):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": [(b"host", b"testserver")],
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(StreamingASGIHandler())(scope, receive, send)
+        return messages
+
+    def test_list_is_streamed(self):
+        state = State.objects.create(name="Texas", abbreviation="TX")
+        location = Location.objects.create(
+            name="Convention Center",
+            city="Austin",
+            room_count=10,
+            state=state,
+        )
+        for n in range(3):
+            Conference.objects.create(
+                name=f"Conference {n}",
+                starts=STARTS,
+                ends=STARTS,
+                description="A conference.",
+                max_presentations=10,
+                max_attendees=100,
+                location=location,
+            )
+        start, *parts = self.get(reverse("api_list_conferences"))
+        self.assertEqual(start["status"], 200)
+        # the opening, the rows and the closing, then the end of the body
+        self.assertGreater(len(parts), 2)
+        self.assertTrue(all(part["more_body"] for part in parts[:-1]))
+        self.assertFalse(parts[-1].get("more_body", False))
+        body = b"".join(part.get("body", b"") for part in parts)
+        self.assertEqual(len(json.loads(body)["conferences"]), 3)
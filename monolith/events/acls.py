@@ -1,52 +1,168 @@
 from .keys import PEXELS_API_KEY, OPEN_WEATHER_API_KEY
+from common.cache import StaleWhileRevalidateCache
+from common.http import UpstreamClient
+from django.conf import settings
 
+import asyncio
 import json
 import requests
 
 
-def get_photo(city, state):
-    url = "https://api.pexels.com/v1/search"
+pexels = UpstreamClient(
+    "pexels",
+    timeout=settings.ACL_HTTP_TIMEOUT,
+    pool_size=settings.ACL_HTTP_POOL_SIZE,
+    failure_threshold=settings.ACL_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.ACL_CIRCUIT_RESET_TIMEOUT,
+)
+open_weather = UpstreamClient(
+    "openweathermap",
+    timeout=settings.ACL_HTTP_TIMEOUT,
+    pool_size=settings.ACL_HTTP_POOL_SIZE,
+    failure_threshold=settings.ACL_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.ACL_CIRCUIT_RESET_TIMEOUT,
+)
+
+weather_cache = StaleWhileRevalidateCache(
+    ttl=settings.WEATHER_CACHE_TTL,
+    stale_ttl=settings.WEATHER_CACHE_STALE_TTL,
+)
+
+
+def fetch_photo(city, state):
+    """
+    Returns the URL of a Pexels photo of the city, or None when Pexels
+    has none. Raises requests.RequestException when the call fails.
+    """
+    url = f"{settings.PEXELS_API_URL}/v1/search"
     params = {
         "per_page": 1,
         "query": city + " " + state,
     }
     headers = {"Authorization": PEXELS_API_KEY}
-    response = requests.get(url, params=params, headers=headers)
+    response = pexels.get(url, params=params, headers=headers)
     content = json.loads(response.content)
 
     try:
-        return {
-            "picture_url": content["photos"][0]["src"]["original"]
-        }
+        return content["photos"][0]["src"]["original"]
     except (KeyError, IndexError):
-        return {"picture_url": None}
+        return None
 
 
-def get_weather(city, state):
-    geo_url = "http://api.openweathermap.org/geo/1.0/direct"
-    params_geo = {
+def geocoding_request(city, state):
+    url = f"{settings.OPEN_WEATHER_API_URL}/geo/1.0/direct"
+    params = {
         "appid": OPEN_WEATHER_API_KEY,
         "q": f"{city} {state}",
     }
-    response = requests.get(geo_url, params=params_geo)
-    content = json.loads(response.content)
+    return url, params
 
-    lat = content[0]["lat"]
-    lon = content[0]["lon"]
 
-    weather_url = "https://api.openweathermap.org/data/2.5/weather"
-    params_weather = {
-        "lat": lat,
-        "lon": lon,
+def weather_request(latitude, longitude):
+    url = f"{settings.OPEN_WEATHER_API_URL}/data/2.5/weather"
+    params = {
+        "lat": latitude,
+        "lon": longitude,
         "units": "imperial",
         "appid": OPEN_WEATHER_API_KEY,
     }
-    response1 = requests.get(weather_url, params=params_weather)
-    content1 = json.loads(response1.content)
+    return url, params
+
+
+def parse_coordinates(content):
+    return content[0]["lat"], content[0]["lon"]
 
+
+def parse_weather(content):
     weather = {}
-    weather["city"] = content1["name"]
-    weather["temperature"] = content1["main"]["temp"]
-    weather["description"] = content1["weather"][0]["description"]
+    weather["city"] = content["name"]
+    weather["temperature"] = content["main"]["temp"]
+    weather["description"] = content["weather"][0]["description"]
 
     return weather
+
+
+def fetch_coordinates(city, state):
+    """
+    Geocodes the city through OpenWeatherMap and returns (lat, lon).
+    Raises requests.RequestException when the call fails and IndexError
+    when the city is unknown.
+    """
+    url, params = geocoding_request(city, state)
+    response = open_weather.get(url, params=params)
+    response.raise_for_status()
+
+    return parse_coordinates(json.loads(response.content))
+
+
+def get_weather(city, state, latitude=None, longitude=None):
+    """
+    Returns the current weather for the city, served from
+    weather_cache. Once an entry is cached, the request path never waits
+    on OpenWeatherMap again: stale entries are refreshed in the
+    background. Passing the location's stored coordinates skips the
+    geocoding call. Returns None when the weather cannot be had, e.g.
+    while the OpenWeatherMap circuit is open.
+    """
+    try:
+        return weather_cache.get(
+            (city, state),
+            lambda: fetch_weather(city, state, latitude, longitude),
+        )
+    except (requests.RequestException, ValueError, KeyError, IndexError):
+        return None
+
+
+def fetch_weather(city, state, latitude=None, longitude=None):
+    if latitude is None or longitude is None:
+        latitude, longitude = fetch_coordinates(city, state)
+
+    url, params = weather_request(latitude, longitude)
+    response = open_weather.get(url, params=params)
+
+    return parse_weather(json.loads(response.content))
+
+
+# asyncio counterparts for the async views
+
+
+async def afetch_coordinates(city, state):
+    url, params = geocoding_request(city, state)
+    response = await open_weather.aget(url, params=params)
+    if response.status_code >= 400:
+        raise requests.HTTPError(f"{response.status_code} from geocoding")
+
+    return parse_coordinates(json.loads(response.content))
+
+
+async def afetch_weather(city, state, latitude=None, longitude=None):
+    if latitude is None or longitude is None:
+        latitude, longitude = await afetch_coordinates(city, state)
+
+    url, params = weather_request(latitude, longitude)
+    response = await open_weather.aget(url, params=params)
+
+    return parse_weather(json.loads(response.content))
+
+
+async def aget_weather(city, state, latitude=None, longitude=None):
+    """
+    Like get_weather(), but gives up and returns None once the upstream
+    calls have taken ACL_ASYNC_BUDGET seconds altogether.
+    """
+    try:
+        return await asyncio.wait_for(
+            weather_cache.aget(
+                (city, state),
+                lambda: afetch_weather(city, state, latitude, longitude),
+            ),
+            timeout=settings.ACL_ASYNC_BUDGET,
+        )
+    except (
+        requests.RequestException,
+        ValueError,
+        KeyError,
+        IndexError,
+        asyncio.TimeoutError,
+    ):
+        return None
@@ -1,20 +1,57 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.urls import path
 
 from .api_views import (
     api_list_conferences,
     api_list_locations,
     api_show_conference,
+    api_show_conference_async,
     api_show_location,
+    api_show_location_async,
+    api_upstream_stats,
+    api_weather_cache_stats,
 )
 
 
+def asgi_only(async_view, sync_view):
+    """
+    Returns a view that hands requests from an ASGI server to async_view
+    and all others to sync_view. A WSGI server runs each async view on
+    an event loop of its own, which is closed with the request, and
+    takes the weather cache's background refresh with it.
+    """
+
+    async def view(request, *args, **kwargs):
+        if isinstance(request, ASGIRequest):
+            return await async_view(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+    return view
+
+
+if settings.ASYNC_READ_VIEWS:
+    show_conference = asgi_only(api_show_conference_async, api_show_conference)
+    show_location = asgi_only(api_show_location_async, api_show_location)
+else:
+    show_conference = api_show_conference
+    show_location = api_show_location
+
+
 urlpatterns = [
     path("conferences/", api_list_conferences, name="api_list_conferences"),
     path(
         "conferences/<int:id>/",
-        api_show_conference,
+        show_conference,
         name="api_show_conference",
     ),
     path("locations/", api_list_locations, name="api_list_locations"),
-    path("locations/<int:id>/", api_show_location, name="api_show_location"),
+    path("locations/<int:id>/", show_location, name="api_show_location"),
+    path(
+        "weather/cache/",
+        api_weather_cache_stats,
+        name="api_weather_cache_stats",
+    ),
+    path("upstreams/", api_upstream_stats, name="api_upstream_stats"),
 ]
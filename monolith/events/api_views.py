@@ -1,9 +1,27 @@
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, Max
 from django.http import JsonResponse
-from .models import Conference, Location, State
+from django.utils import timezone
+from .models import (
+    Conference,
+    Location,
+    LocationEnrichment,
+    State,
+    states,
+)
 from common.json import ModelEncoder
-from django.views.decorators.http import require_http_methods
+from common.pagination import paginated_json_response
+from outbox.models import OutboxMessage
+from django.views.decorators.http import condition, require_http_methods
 import json
-from .acls import get_photo, get_weather
+from .acls import (
+    aget_weather,
+    get_weather,
+    open_weather,
+    pexels,
+    weather_cache,
+)
 
 
 class LocationListEncoder(ModelEncoder):
@@ -21,6 +39,7 @@ class LocationDetailEncoder(ModelEncoder):
         "updated",
         "picture_url",
     ]
+    extra_data_fields = ["state"]
 
     def get_extra_data(self, o):
         return {"state": o.state.abbreviation}
@@ -49,7 +68,42 @@ class ConferenceListEncoder(ModelEncoder):
     properties = ["name"]
 
 
+class ConferenceInfoEncoder(ModelEncoder):
+    model = Conference
+    properties = ["name", "updated"]
+
+
+def send_conference_data(conference, deleted=False):
+    """
+    Queues a conference_info event for the conference. Call it in the
+    transaction that saves or deletes the conference.
+    """
+    message = json.dumps(
+        {"conference": conference, "deleted": deleted},
+        cls=ConferenceInfoEncoder,
+    )
+    OutboxMessage.to_exchange("conference_info", message)
+
+
+def conference_list_etag(request):
+    """
+    A validator for the conference list that changes whenever a
+    conference is added, changed or deleted, so pollers can send
+    If-None-Match and get a 304 while nothing has changed.
+    """
+    if request.method != "GET":
+        return None
+    conferences = Conference.objects.aggregate(
+        count=Count("id"),
+        updated=Max("updated"),
+    )
+    count, updated = conferences["count"], conferences["updated"]
+    version = updated.timestamp() if updated else 0
+    return f'W/"{count}-{version}"'
+
+
 @require_http_methods(["GET", "POST"])
+@condition(etag_func=conference_list_etag)
 def api_list_conferences(request):
     """
     Lists the conference names and the link to the conference.
@@ -68,12 +122,21 @@ def api_list_conferences(request):
             ...
         ]
     }
+
+    When the query string has a "limit" or a "cursor", only one page
+    of at most "limit" entries is returned, along with a "next" key
+    holding the URL of the following page (null on the last page).
+
+    Responses carry an ETag for the whole list; a request whose
+    If-None-Match still matches gets an empty 304.
     """
     if request.method == "GET":
         conferences = Conference.objects.all()
-        return JsonResponse(
-            {"conferences": conferences},
-            encoder=ConferenceListEncoder,
+        return paginated_json_response(
+            request,
+            "conferences",
+            conferences,
+            ConferenceListEncoder,
         )
     else:
         content = json.loads(request.body)
@@ -85,7 +148,9 @@ def api_list_conferences(request):
                 {"message": "Invalid location id"},
                 status=400,
             )
-        conference = Conference.objects.create(**content)
+        with transaction.atomic():
+            conference = Conference.objects.create(**content)
+            send_conference_data(conference)
         return JsonResponse(
             conference,
             encoder=ConferenceDetailEncoder,
@@ -123,7 +188,12 @@ def api_show_conference(request, id):
         conference = Conference.objects.get(id=id)
 
         location = conference.location
-        weather = get_weather(location.city, location.state.abbreviation)
+        weather = get_weather(
+            location.city,
+            location.state.abbreviation,
+            location.latitude,
+            location.longitude,
+        )
 
         return JsonResponse(
             {"conference": conference, "weather": weather},
@@ -131,7 +201,12 @@ def api_show_conference(request, id):
             safe=False,
         )
     elif request.method == "DELETE":
-        count, _ = Conference.objects.filter(id=id).delete()
+        with transaction.atomic():
+            conference = Conference.objects.filter(id=id).first()
+            count = 0
+            if conference is not None:
+                send_conference_data(conference, deleted=True)
+                count, _ = Conference.objects.filter(id=id).delete()
         return JsonResponse({"deleted": count > 0})
     else:
         content = json.loads(request.body)
@@ -143,8 +218,12 @@ def api_show_conference(request, id):
                 {"message": "Invalid location id"},
                 status=400,
             )
-        Conference.objects.filter(id=id).update(**content)
-        conference = Conference.objects.get(id=id)
+        # update() skips auto_now, and the list ETag relies on updated
+        content["updated"] = timezone.now()
+        with transaction.atomic():
+            Conference.objects.filter(id=id).update(**content)
+            conference = Conference.objects.get(id=id)
+            send_conference_data(conference)
 
         return JsonResponse(
             conference,
@@ -172,18 +251,24 @@ def api_list_locations(request):
             ...
         ]
     }
+
+    When the query string has a "limit" or a "cursor", only one page
+    of at most "limit" entries is returned, along with a "next" key
+    holding the URL of the following page (null on the last page).
     """
     if request.method == "GET":
         locations = Location.objects.all()
-        return JsonResponse(
-            {"locations": locations},
-            encoder=LocationListEncoder,
+        return paginated_json_response(
+            request,
+            "locations",
+            locations,
+            LocationListEncoder,
         )
     else:
         content = json.loads(request.body)
 
         try:
-            state = State.objects.get(abbreviation=content["state"])
+            state = states.get(abbreviation=content["state"])
             content["state"] = state
         except State.DoesNotExist:
             return JsonResponse(
@@ -191,10 +276,11 @@ def api_list_locations(request):
                 status=400,
             )
 
-        photo = get_photo(content["city"], content["state"].abbreviation)
-        content.update(photo)
-
-        location = Location.objects.create(**content)
+        # the photo and coordinates are looked up later by the
+        # enrich_locations worker, so creating a location is pure DB work
+        with transaction.atomic():
+            location = Location.objects.create(**content)
+            LocationEnrichment.objects.create(location=location)
         return JsonResponse(
             location,
             encoder=LocationDetailEncoder,
@@ -228,13 +314,21 @@ def api_show_location(request, id):
             safe=False,
         )
     elif request.method == "DELETE":
-        count, _ = Location.objects.filter(id=id).delete()
+        with transaction.atomic():
+            # deleting the location deletes its conferences too, so
+            # the attendees service has to hear about each of them
+            conferences = ConferenceInfoEncoder.optimize_queryset(
+                Conference.objects.filter(location_id=id)
+            )
+            for conference in conferences:
+                send_conference_data(conference, deleted=True)
+            count, _ = Location.objects.filter(id=id).delete()
         return JsonResponse({"deleted": count > 0})
     else:
         content = json.loads(request.body)
         try:
             if "state" in content:
-                state = State.objects.get(abbreviation=content["state"])
+                state = states.get(abbreviation=content["state"])
                 content["state"] = state
         except State.DoesNotExist:
             return JsonResponse(
@@ -242,10 +336,117 @@ def api_show_location(request, id):
                 status=400,
             )
 
-        Location.objects.filter(id=id).update(**content)
+        moved = False
+        if "city" in content or "state" in content:
+            location = Location.objects.select_related("state").get(id=id)
+            city = content.get("city", location.city)
+            state = content.get("state", location.state)
+            moved = city != location.city or state != location.state
+        if moved:
+            # the old coordinates and photo describe the wrong place;
+            # clear them and let the enrich_locations worker look up the
+            # new ones
+            content.update(
+                {"picture_url": None, "latitude": None, "longitude": None}
+            )
+            with transaction.atomic():
+                Location.objects.filter(id=id).update(**content)
+                LocationEnrichment.enqueue(id)
+        else:
+            Location.objects.filter(id=id).update(**content)
         location = Location.objects.get(id=id)
         return JsonResponse(
             location,
             encoder=LocationDetailEncoder,
             safe=False,
         )
+
+
+async def api_show_conference_async(request, id):
+    """
+    The async version of api_show_conference. GET reads the conference
+    through the async ORM and fetches the weather with the async HTTP
+    client within ACL_ASYNC_BUDGET, so one worker can have many slow
+    upstream calls in flight. Every other method is handed to
+    api_show_conference.
+    """
+    if request.method != "GET":
+        return await sync_to_async(api_show_conference)(request, id)
+
+    conference = await Conference.objects.select_related(
+        "location__state"
+    ).aget(id=id)
+
+    location = conference.location
+    weather = await aget_weather(
+        location.city,
+        location.state.abbreviation,
+        location.latitude,
+        location.longitude,
+    )
+
+    return JsonResponse(
+        {"conference": conference, "weather": weather},
+        encoder=ConferenceDetailEncoder,
+        safe=False,
+    )
+
+
+async def api_show_location_async(request, id):
+    """
+    The async version of api_show_location. GET reads the location
+    through the async ORM; every other method is handed to
+    api_show_location.
+    """
+    if request.method != "GET":
+        return await sync_to_async(api_show_location)(request, id)
+
+    location = await LocationDetailEncoder.optimize_queryset(
+        Location.objects.all()
+    ).aget(id=id)
+    return JsonResponse(
+        location,
+        encoder=LocationDetailEncoder,
+        safe=False,
+    )
+
+
+@require_http_methods(["GET"])
+def api_weather_cache_stats(request):
+    """
+    Returns the hit/miss counters of this worker's weather cache.
+
+    {
+        "hits": lookups served fresh from the cache,
+        "stale_hits": lookups served stale while refreshing,
+        "misses": lookups that waited on OpenWeatherMap,
+        "refreshes": successful background refreshes,
+        "refresh_errors": failed background refreshes,
+        "size": the number of cached cities,
+    }
+    """
+    return JsonResponse(weather_cache.stats())
+
+
+@require_http_methods(["GET"])
+def api_upstream_stats(request):
+    """
+    Returns latency and failure metrics for this worker's third-party
+    API clients, keyed by upstream name.
+
+    {
+        "pexels": {
+            "state": "closed", "open" or "half-open",
+            "requests": calls that reached the upstream,
+            "failures": errors, timeouts and 5xx responses,
+            "short_circuits": calls refused while the circuit was open,
+            "total_seconds": time spent in upstream calls,
+            "mean_seconds": average call time,
+            "max_seconds": slowest call,
+        },
+        "openweathermap": {...},
+    }
+    """
+    return JsonResponse(
+        {client.name: client.stats() for client in (pexels, open_weather)}
+    )
@@ -0,0 +1,142 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+import requests
+
+from events.acls import fetch_coordinates
+from events.models import Location
+
+
+class RateLimiter:
+    """
+    Spaces calls to wait() at least 1 / rate seconds apart across all
+    threads.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Command(BaseCommand):
+    help = "Geocodes every location that has no stored coordinates"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="number of concurrent geocoding requests",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=1.0,
+            help="maximum geocoding requests per second",
+        )
+        parser.add_argument(
+            "--retries",
+            type=int,
+            default=3,
+            help="retries for a city the upstream rate limited (HTTP 429)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="locations written per bulk update",
+        )
+
+    def handle(self, *args, **options):
+        locations = (
+            Location.objects.filter(
+                Q(latitude__isnull=True) | Q(longitude__isnull=True)
+            )
+            .select_related("state")
+            .only("id", "city", "state__abbreviation")
+        )
+        # many locations share a city, which only needs geocoding once
+        places = defaultdict(list)
+        for location in locations.iterator(chunk_size=options["batch_size"]):
+            key = (location.city, location.state.abbreviation)
+            places[key].append(location.id)
+
+        limiter = RateLimiter(options["rate"])
+        pending = []
+        updated = 0
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            futures = {
+                pool.submit(
+                    self.geocode,
+                    limiter,
+                    city,
+                    state,
+                    options["retries"],
+                ): (city, state)
+                for city, state in places
+            }
+            for future in as_completed(futures):
+                ids = places[futures[future]]
+                coordinates = future.result()
+                if coordinates is None:
+                    failed += len(ids)
+                    continue
+                latitude, longitude = coordinates
+                pending.extend(
+                    Location(id=id, latitude=latitude, longitude=longitude)
+                    for id in ids
+                )
+                if len(pending) >= options["batch_size"]:
+                    updated += self.save(pending)
+                    pending = []
+        updated += self.save(pending)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Geocoded {updated} locations in {len(places)} cities; "
+                f"{failed} locations could not be resolved"
+            )
+        )
+
+    def geocode(self, limiter, city, state, retries):
+        for attempt in range(retries + 1):
+            limiter.wait()
+            try:
+                return fetch_coordinates(city, state)
+            except requests.HTTPError as e:
+                if e.response.status_code != 429 or attempt == retries:
+                    break
+                try:
+                    delay = float(e.response.headers["Retry-After"])
+                except (KeyError, ValueError):
+                    delay = 2**attempt
+                time.sleep(delay)
+            except (
+                requests.RequestException,
+                ValueError,
+                KeyError,
+                IndexError,
+            ):
+                break
+        self.stderr.write(f"Could not geocode {city}, {state}")
+        return None
+
+    def save(self, locations):
+        # bulk_update leaves Location.updated alone, which is what a
+        # backfill should do
+        Location.objects.bulk_update(locations, ["latitude", "longitude"])
+        return len(locations)
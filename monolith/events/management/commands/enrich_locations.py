@@ -0,0 +1,182 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+import requests
+
+from events.acls import fetch_coordinates, fetch_photo
+from events.models import Location, LocationEnrichment
+
+
+def unchanged(jobs):
+    """
+    Matches the jobs that haven't been queued again since they were
+    read.
+    """
+    condition = Q(pk__in=[])
+    for job in jobs:
+        condition |= Q(pk=job.pk, queued=job.queued)
+    return condition
+
+
+class Command(BaseCommand):
+    help = (
+        "Looks up the photo and coordinates of newly created or moved "
+        "locations"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="jobs claimed per batch",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="number of concurrent upstream lookups",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=8,
+            help="attempts before a job whose lookups fail is dropped",
+        )
+        parser.add_argument(
+            "--retry-delay",
+            type=float,
+            default=60.0,
+            help="seconds before a failed job is tried again, doubled "
+            "after every further failure",
+        )
+        parser.add_argument(
+            "--max-retry-delay",
+            type=float,
+            default=3600.0,
+            help="the most seconds a failed job waits",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="seconds to wait when there are no jobs",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="exit once no job is due instead of waiting",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            finished = self.run_batch(options)
+            # wait when no job was due, and when every lookup failed,
+            # e.g. while an upstream is down
+            if finished == 0:
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
+
+    def run_batch(self, options):
+        """
+        Works through the jobs that are due, up to --batch-size of them,
+        and returns how many were finished, i.e. succeeded or were
+        dropped.
+        """
+        jobs = list(
+            LocationEnrichment.objects.select_related("location__state")
+            .filter(next_attempt__lte=now())
+            .order_by("next_attempt")[: options["batch_size"]]
+        )
+        if not jobs:
+            return 0
+
+        # locations created together often share a city, which only
+        # needs looking up once
+        places = defaultdict(list)
+        for job in jobs:
+            place = (job.location.city, job.location.state.abbreviation)
+            places[place].append(job)
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            results = dict(
+                zip(places, pool.map(lambda p: self.lookup(*p), places))
+            )
+
+        locations = []
+        done = []
+        failed = []
+        for place, place_jobs in places.items():
+            result = results[place]
+            if result is None:
+                failed.extend(place_jobs)
+                continue
+            for job in place_jobs:
+                job.location.picture_url = result["picture_url"]
+                job.location.latitude = result["latitude"]
+                job.location.longitude = result["longitude"]
+                locations.append(job.location)
+                done.append(job)
+
+        # failed jobs back off exponentially; jobs with the same
+        # number of attempts are rescheduled together
+        retry = defaultdict(list)
+        dropped = []
+        for job in failed:
+            if job.attempts + 1 < options["max_attempts"]:
+                retry[job.attempts + 1].append(job)
+            else:
+                dropped.append(job)
+
+        with transaction.atomic():
+            Location.objects.bulk_update(
+                locations,
+                ["picture_url", "latitude", "longitude"],
+            )
+            # a job queued again while we worked has a newer "queued"
+            # and is left alone, to be done afresh
+            for attempts, retry_jobs in retry.items():
+                delay = min(
+                    options["retry_delay"] * 2 ** (attempts - 1),
+                    options["max_retry_delay"],
+                )
+                LocationEnrichment.objects.filter(
+                    unchanged(retry_jobs)
+                ).update(
+                    attempts=attempts,
+                    next_attempt=now() + timedelta(seconds=delay),
+                )
+            LocationEnrichment.objects.filter(
+                unchanged(done + dropped)
+            ).delete()
+
+        for job in dropped:
+            self.stderr.write(
+                f"Giving up on location {job.pk} after "
+                f"{options['max_attempts']} attempts"
+            )
+        return len(done) + len(dropped)
+
+    def lookup(self, city, state):
+        try:
+            picture_url = fetch_photo(city, state)
+        except (requests.RequestException, ValueError):
+            return None
+        try:
+            latitude, longitude = fetch_coordinates(city, state)
+        except (KeyError, IndexError):
+            # the city is unknown to the geocoder; nothing to retry
+            latitude, longitude = None, None
+        except (requests.RequestException, ValueError):
+            return None
+        return {
+            "picture_url": picture_url,
+            "latitude": latitude,
+            "longitude": longitude,
+        }
@@ -0,0 +1,244 @@
+from datetime import timedelta
+import json
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import now
+
+from accounts.models import User
+from common.seeding import (
+    COMPANIES,
+    EPOCH,
+    TOPICS,
+    bulk_insert,
+    conference_names,
+    db_value,
+    insert_rows,
+    people,
+    reset_sequences,
+    sizes,
+)
+from events.models import Conference, Location, State
+from presentations.models import Presentation, Status
+
+
+CITIES = [
+    ("Atlanta", "GA"),
+    ("Austin", "TX"),
+    ("Boston", "MA"),
+    ("Chicago", "IL"),
+    ("Denver", "CO"),
+    ("Las Vegas", "NV"),
+    ("Los Angeles", "CA"),
+    ("Miami", "FL"),
+    ("Minneapolis", "MN"),
+    ("Nashville", "TN"),
+    ("New Orleans", "LA"),
+    ("New York", "NY"),
+    ("Orlando", "FL"),
+    ("Philadelphia", "PA"),
+    ("Phoenix", "AZ"),
+    ("Portland", "OR"),
+    ("Raleigh", "NC"),
+    ("Salt Lake City", "UT"),
+    ("San Diego", "CA"),
+    ("San Francisco", "CA"),
+    ("Seattle", "WA"),
+    ("Washington", "DC"),
+]
+VENUES = ["Convention Center", "Expo Hall", "Conference Center", "Hotel"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills an empty database with generated locations, conferences, "
+        "presentations and users; the attendees service's seed command "
+        "with the same --scale and --seed generates matching data"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="1 is 1,000 conferences and 10,000 presentations and users",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="seed for the generated data",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="rows written per insert",
+        )
+
+    def handle(self, *args, **options):
+        # seeded rows get fixed ids, so that the attendees service can
+        # derive the conference hrefs on its own
+        if (
+            Location.objects.exists()
+            or Conference.objects.exists()
+            or Presentation.objects.exists()
+            or User.objects.filter(is_superuser=False).exists()
+        ):
+            raise CommandError(
+                "The database already has data; run manage.py flush first"
+            )
+
+        started = time.monotonic()
+        seed = options["seed"]
+        batch_size = options["batch_size"]
+        counts = sizes(options["scale"])
+        everyone = people(seed, counts["people"])
+        created = db_value(Presentation, "created", now())
+        with transaction.atomic():
+            state_ids, status_ids = self.load_value_objects()
+            written = {
+                "locations": bulk_insert(
+                    Location,
+                    self.locations(seed, counts["locations"], state_ids),
+                    batch_size,
+                ),
+                "conferences": bulk_insert(
+                    Conference,
+                    self.conferences(seed, counts),
+                    batch_size,
+                ),
+                "presentations": insert_rows(
+                    Presentation,
+                    [
+                        "id",
+                        "presenter_name",
+                        "company_name",
+                        "presenter_email",
+                        "title",
+                        "synopsis",
+                        "created",
+                        "status",
+                        "conference",
+                    ],
+                    self.presentations(
+                        seed, counts, everyone, status_ids, created
+                    ),
+                    batch_size,
+                ),
+                "users": insert_rows(
+                    User,
+                    [
+                        "username",
+                        "email",
+                        "first_name",
+                        "last_name",
+                        "password",
+                        "is_superuser",
+                        "is_staff",
+                        "is_active",
+                        "date_joined",
+                    ],
+                    self.users(everyone[: counts["users"]], created),
+                    batch_size,
+                ),
+            }
+            reset_sequences(Location, Conference, Presentation)
+
+        summary = ", ".join(f"{n} {name}" for name, n in written.items())
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Seeded {summary} in {elapsed:.1f}s")
+        )
+
+    def load_value_objects(self):
+        """
+        Creates whichever states and statuses from the project's
+        data.json are missing, and returns the ids of both by
+        abbreviation and by name.
+        """
+        with open(settings.BASE_DIR / "conference_go" / "data.json") as f:
+            fixtures = json.load(f)
+        existing = set(State.objects.values_list("abbreviation", flat=True))
+        State.objects.bulk_create(
+            State(**fixture["fields"])
+            for fixture in fixtures
+            if fixture["model"] == "events.state"
+            and fixture["fields"]["abbreviation"] not in existing
+        )
+        existing = set(Status.objects.values_list("name", flat=True))
+        Status.objects.bulk_create(
+            Status(**fixture["fields"])
+            for fixture in fixtures
+            if fixture["model"] == "presentations.status"
+            and fixture["fields"]["name"] not in existing
+        )
+        return (
+            dict(State.objects.values_list("abbreviation", "id")),
+            list(Status.objects.values_list("id", flat=True)),
+        )
+
+    def locations(self, seed, count, state_ids):
+        rng = random.Random(f"{seed}:locations")
+        for id in range(1, count + 1):
+            city, state = rng.choice(CITIES)
+            yield Location(
+                id=id,
+                name=f"{city} {rng.choice(VENUES)} {id}",
+                city=city,
+                state_id=state_ids[state],
+                room_count=rng.randint(5, 200),
+            )
+
+    def conferences(self, seed, counts):
+        rng = random.Random(f"{seed}:conference-details")
+        for id, name in conference_names(seed, counts["conferences"]):
+            starts = EPOCH + timedelta(days=rng.randrange(3 * 365))
+            yield Conference(
+                id=id,
+                name=name,
+                starts=starts,
+                ends=starts + timedelta(days=rng.randint(1, 4)),
+                description=f"{name} brings together people who work on "
+                f"{rng.choice(TOPICS).lower()}.",
+                max_presentations=rng.randint(10, 200),
+                max_attendees=rng.randint(100, 20_000),
+                location_id=rng.randint(1, counts["locations"]),
+            )
+
+    def presentations(self, seed, counts, everyone, status_ids, created):
+        rng = random.Random(f"{seed}:presentations")
+        companies = COMPANIES + [None]
+        for id in range(1, counts["presentations"] + 1):
+            first, last, email = rng.choice(everyone)
+            yield (
+                id,
+                f"{first} {last}",
+                rng.choice(companies),
+                email,
+                f"{rng.choice(TOPICS)} in practice, part {id}",
+                "A talk generated by the seed command.",
+                created,
+                rng.choice(status_ids),
+                rng.randint(1, counts["conferences"]),
+            )
+
+    def users(self, accounts, joined):
+        # nobody can log in as a seeded user
+        password = make_password(None)
+        for first, last, email in accounts:
+            yield (
+                email.split("@")[0],
+                email,
+                first,
+                last,
+                password,
+                False,
+                False,
+                True,
+                joined,
+            )
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.7 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_location_picture_url'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conference',
+            index=models.Index(fields=['starts', 'name', 'id'], name='conference_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['name', 'id'], name='location_keyset_idx'),
+        ),
+    ]
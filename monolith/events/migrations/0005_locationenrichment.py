@@ -0,0 +1,37 @@
+# Generated by Django 4.1.7 on 2026-10-18 16:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0004_location_latitude_location_longitude"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LocationEnrichment",
+            fields=[
+                (
+                    "location",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="events.location",
+                    ),
+                ),
+                (
+                    "queued",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ("queued",),
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.7 on 2026-10-18 17:46
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0005_locationenrichment"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="locationenrichment",
+            options={"ordering": ("next_attempt",)},
+        ),
+        migrations.AddField(
+            model_name="locationenrichment",
+            name="next_attempt",
+            field=models.DateTimeField(
+                db_index=True, default=django.utils.timezone.now
+            ),
+        ),
+    ]
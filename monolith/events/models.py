@@ -1,5 +1,8 @@
 from django.db import models
 from django.urls import reverse
+from django.utils.timezone import now
+
+from common.registry import ValueObjectRegistry
 
 
 class State(models.Model):
@@ -21,6 +24,10 @@ class State(models.Model):
         ordering = ("abbreviation",)  # Default ordering for State
 
 
+# locations are created and updated by state abbreviation
+states = ValueObjectRegistry(State, "abbreviation")
+
+
 class Location(models.Model):
     """
     The Location model describes the place at which an
@@ -33,6 +40,10 @@ class Location(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     picture_url = models.URLField(null=True)
+    # geocoded from city and state when they are set, so weather
+    # lookups can skip the geocoding call
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
 
     state = models.ForeignKey(
         State,
@@ -40,14 +51,53 @@ class Location(models.Model):
         on_delete=models.PROTECT,
     )
 
+    api_url_name = "api_show_location"
+
     def get_api_url(self):
-        return reverse("api_show_location", kwargs={"id": self.id})
+        return reverse(self.api_url_name, kwargs={"id": self.id})
 
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ("name",)  # Default ordering for Location
+        indexes = [
+            # keyset pagination walks (name, id)
+            models.Index(fields=["name", "id"], name="location_keyset_idx"),
+        ]
+
+
+class LocationEnrichment(models.Model):
+    """
+    The LocationEnrichment model is a pending job to look up the photo
+    and coordinates of a Location outside of the request that created
+    or moved it. The enrich_locations management command works through
+    these jobs.
+    """
+
+    location = models.OneToOneField(
+        Location,
+        related_name="+",
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    # reset whenever the job is queued again, so a worker holding an
+    # older copy of the job knows not to delete it
+    queued = models.DateTimeField(default=now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # a failed job waits until then before it is tried again
+    next_attempt = models.DateTimeField(default=now, db_index=True)
+
+    @classmethod
+    def enqueue(cls, location_id):
+        queued = now()
+        cls.objects.update_or_create(
+            location_id=location_id,
+            defaults={"queued": queued, "attempts": 0, "next_attempt": queued},
+        )
+
+    class Meta:
+        ordering = ("next_attempt",)  # Jobs are done as they come due
 
 
 class Conference(models.Model):
@@ -73,11 +123,20 @@ class Conference(models.Model):
         on_delete=models.CASCADE,
     )
 
+    api_url_name = "api_show_conference"
+
     def get_api_url(self):
-        return reverse("api_show_conference", kwargs={"id": self.id})
+        return reverse(self.api_url_name, kwargs={"id": self.id})
 
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ("starts", "name")  # Default ordering for Conference
+        indexes = [
+            # keyset pagination walks (starts, name, id)
+            models.Index(
+                fields=["starts", "name", "id"],
+                name="conference_keyset_idx",
+            ),
+        ]
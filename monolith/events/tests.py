@@ -0,0 +1,284 @@
+import asyncio
+from datetime import datetime, timezone
+import json
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+import requests
+
+from benchmarks.stubs import start_upstream_stub
+from common.cache import StaleWhileRevalidateCache
+from common.http import CircuitOpenError, UpstreamClient
+from events import acls
+from events.models import Conference, Location, State
+from outbox.models import OutboxMessage
+
+
+WEATHER = {"city": "Austin", "temperature": 75.0, "description": "clear sky"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class WeatherCacheTests(SimpleTestCase):
+    """
+    get_weather through weather_cache, against the local stub from
+    benchmarks.stubs in place of OpenWeatherMap.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server, cls.url = start_upstream_stub(0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.delay = 0
+        self.clock = Clock()
+        self.cache = StaleWhileRevalidateCache(ttl=60, stale_ttl=600)
+        self.client = UpstreamClient("openweathermap", timeout=(1, 1))
+        for context in [
+            mock.patch.object(acls, "weather_cache", self.cache),
+            mock.patch.object(acls, "open_weather", self.client),
+            mock.patch("common.cache.time", self.clock),
+            override_settings(OPEN_WEATHER_API_URL=self.url),
+        ]:
+            self.enterContext(context)
+
+    def get_weather(self):
+        # the coordinates are known, so one upstream call per load
+        return acls.get_weather("Austin", "TX", 30.27, -97.74)
+
+    def upstream_calls(self):
+        return self.client.stats()["requests"]
+
+    def wait_for(self, counter, value):
+        deadline = time.monotonic() + 5
+        while self.cache.stats()[counter] < value:
+            if time.monotonic() > deadline:
+                self.fail(f"{counter} never reached {value}")
+            time.sleep(0.01)
+
+    def test_miss_loads_from_upstream(self):
+        self.assertEqual(self.get_weather(), WEATHER)
+        self.assertEqual(self.upstream_calls(), 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["size"], 1)
+
+    def test_fresh_hit_skips_upstream(self):
+        self.get_weather()
+        self.clock.now += 59
+        self.assertEqual(self.get_weather(), WEATHER)
+        self.assertEqual(self.upstream_calls(), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_stale_hit_refreshes_in_background(self):
+        self.get_weather()
+        self.clock.now += 61
+        self.assertEqual(self.get_weather(), WEATHER)
+        self.wait_for("refreshes", 1)
+        self.assertEqual(self.cache.stats()["stale_hits"], 1)
+        self.assertEqual(self.upstream_calls(), 2)
+        # the refreshed entry is fresh again
+        self.get_weather()
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.upstream_calls(), 2)
+
+    def test_expired_entry_is_a_miss(self):
+        self.get_weather()
+        self.clock.now += 60 + 600
+        self.get_weather()
+        self.assertEqual(self.cache.stats()["misses"], 2)
+        self.assertEqual(self.upstream_calls(), 2)
+
+    def test_failed_load_is_not_cached(self):
+        with override_settings(OPEN_WEATHER_API_URL="http://127.0.0.1:9"):
+            self.assertIsNone(self.get_weather())
+        self.assertEqual(self.cache.stats()["size"], 0)
+        self.assertEqual(self.get_weather(), WEATHER)
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+    def test_failed_refresh_keeps_stale_value(self):
+        self.get_weather()
+        self.clock.now += 61
+        with override_settings(OPEN_WEATHER_API_URL="http://127.0.0.1:9"):
+            self.assertEqual(self.get_weather(), WEATHER)
+            self.wait_for("refresh_errors", 1)
+        self.assertEqual(self.cache.stats()["refreshes"], 0)
+        self.assertEqual(self.get_weather(), WEATHER)
+
+    def test_concurrent_misses_share_one_load(self):
+        self.server.delay = 0.2
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.get_weather()))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [WEATHER] * 5)
+        self.assertEqual(self.upstream_calls(), 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats["misses"], 5)
+        self.assertEqual(stats["coalesced_misses"], 4)
+
+
+class UpstreamClientTests(SimpleTestCase):
+    """
+    UpstreamClient.aget's AsyncClients, one per event loop, against the
+    local stub from benchmarks.stubs.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server, cls.url = start_upstream_stub(0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = UpstreamClient("stub", timeout=(1, 1))
+
+    async def get_twice(self):
+        for _ in range(2):
+            response = await self.client.aget(f"{self.url}/data/")
+            self.assertEqual(response.status_code, 200)
+        return self.client.async_client
+
+    def test_one_client_per_loop(self):
+        async def clients():
+            return await asyncio.gather(self.get_twice(), self.get_twice())
+
+        first, second = asyncio.run(clients())
+        self.assertIs(first, second)
+
+    def test_client_is_closed_with_its_loop(self):
+        first = asyncio.run(self.get_twice())
+        self.assertTrue(first.is_closed)
+        second = asyncio.run(self.get_twice())
+        self.assertIsNot(second, first)
+        # the closed loop's entry is gone
+        self.assertEqual(len(self.client._async_clients), 1)
+
+    def test_loops_in_other_threads_keep_their_clients(self):
+        clients = []
+        barrier = threading.Barrier(4)
+
+        async def get():
+            client = await self.get_twice()
+            # every loop is running at once
+            await asyncio.to_thread(barrier.wait)
+            clients.append((client, await self.get_twice()))
+
+        threads = [
+            threading.Thread(target=asyncio.run, args=(get(),))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(clients), 4)
+        self.assertTrue(all(before is after for before, after in clients))
+        self.assertEqual(len({id(client) for client, _ in clients}), 4)
+        self.assertTrue(all(client.is_closed for client, _ in clients))
+
+    def test_open_circuit_is_a_requests_error(self):
+        self.client = UpstreamClient(
+            "stub", timeout=(1, 1), failure_threshold=1
+        )
+
+        async def get():
+            with self.assertRaises(requests.ConnectionError):
+                await self.client.aget("http://127.0.0.1:9/")
+            with self.assertRaises(CircuitOpenError):
+                await self.client.aget(f"{self.url}/data/")
+
+        asyncio.run(get())
+        self.assertTrue(
+            issubclass(CircuitOpenError, requests.RequestException)
+        )
+
+
+class DeleteLocationTests(TestCase):
+    """
+    Deleting a location queues a conference_info deleted event for each
+    of the conferences deleted with it.
+    """
+
+    def setUp(self):
+        state = State.objects.create(name="Texas", abbreviation="TX")
+        self.location, other = [
+            Location.objects.create(
+                name=f"Convention Center {n}",
+                city="Austin",
+                room_count=10,
+                state=state,
+            )
+            for n in range(2)
+        ]
+        starts = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        self.conferences = [
+            Conference.objects.create(
+                name=f"Conference {n}",
+                starts=starts,
+                ends=starts,
+                description="A conference.",
+                max_presentations=10,
+                max_attendees=100,
+                location=location,
+            )
+            for n, location in enumerate([self.location, self.location, other])
+        ]
+
+    def delete(self, id):
+        url = reverse("api_show_location", kwargs={"id": id})
+        return self.client.delete(url).json()
+
+    def test_deleted_conferences_are_announced(self):
+        self.assertEqual(self.delete(self.location.id), {"deleted": True})
+        messages = [
+            json.loads(message.body)
+            for message in OutboxMessage.objects.filter(
+                exchange="conference_info"
+            )
+        ]
+        self.assertEqual(
+            messages,
+            [
+                {
+                    "conference": {
+                        "href": conference.get_api_url(),
+                        "name": conference.name,
+                        "updated": conference.updated.isoformat(),
+                    },
+                    "deleted": True,
+                }
+                for conference in self.conferences[:2]
+            ],
+        )
+        self.assertEqual(Conference.objects.count(), 1)
+
+    def test_missing_location_queues_nothing(self):
+        self.assertEqual(self.delete(0), {"deleted": False})
+        self.assertFalse(OutboxMessage.objects.exists())
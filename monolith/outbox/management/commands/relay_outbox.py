@@ -0,0 +1,123 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from pika.exceptions import AMQPError
+
+from common.publisher import Publisher
+from outbox.models import OutboxMessage
+
+
+class Command(BaseCommand):
+    help = "Publishes the messages waiting in the outbox to RabbitMQ"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="messages published per batch",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0.5,
+            help="seconds to wait when the outbox is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="exit once the outbox is empty instead of waiting",
+        )
+
+    def handle(self, *args, **options):
+        # a message is only deleted once the broker has confirmed it
+        self.publisher = Publisher(
+            settings.BROKER_HOST,
+            settings.BROKER_PORT,
+            confirms=True,
+        )
+        try:
+            while True:
+                try:
+                    relayed = self.run_batch(options["batch_size"])
+                except AMQPError as e:
+                    self.stderr.write(f"Could not reach the broker: {e!r}")
+                    relayed = 0
+                    if options["once"]:
+                        raise
+                if relayed == 0:
+                    if options["once"]:
+                        return
+                    time.sleep(options["interval"])
+        finally:
+            self.publisher.close()
+
+    def run_batch(self, batch_size):
+        if connection.features.has_select_for_update_skip_locked:
+            # several relays can run side by side, each holding row
+            # locks on the messages it is publishing
+            with transaction.atomic():
+                relayed, error = self.relay(
+                    OutboxMessage.objects.select_for_update(skip_locked=True),
+                    batch_size,
+                )
+        else:
+            # without row locks only one relay can run, and it keeps no
+            # transaction open while publishing: on SQLite that would
+            # hold back every writer, and the delete could not upgrade
+            # its read lock while another connection was writing
+            relayed, error = self.relay(
+                OutboxMessage.objects.all(), batch_size
+            )
+        # raised only now, so that the deletes above are committed
+        if error is not None:
+            raise error
+        return relayed
+
+    def relay(self, queryset, batch_size):
+        """
+        Publishes the oldest batch_size messages and deletes the ones
+        the broker confirmed. Returns how many messages were read and
+        the AMQPError that stopped publishing, if any.
+        """
+        messages = list(queryset.order_by("id")[:batch_size])
+        if not messages:
+            return 0, None
+
+        # one publish, and so one confirmation, per destination;
+        # messages keep their order within a destination
+        destinations = {}
+        for message in messages:
+            destination = (
+                message.exchange,
+                message.exchange_type,
+                message.routing_key,
+            )
+            destinations.setdefault(destination, []).append(message)
+
+        published = []
+        error = None
+        for destination, batch in destinations.items():
+            try:
+                self.publish(destination, [m.body for m in batch])
+            except AMQPError as e:
+                error = e
+                break
+            published.extend(m.id for m in batch)
+        # whatever the broker confirmed before a failure is done
+        OutboxMessage.objects.filter(id__in=published).delete()
+        return len(messages), error
+
+    def publish(self, destination, bodies):
+        exchange, exchange_type, routing_key = destination
+        if exchange:
+            self.publisher.publish_to_exchange(
+                exchange,
+                *bodies,
+                exchange_type=exchange_type,
+                routing_key=routing_key,
+            )
+        else:
+            self.publisher.publish_to_queue(routing_key, *bodies)
@@ -0,0 +1,34 @@
+# Generated by Django 4.1.7 on 2026-10-18 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("exchange", models.CharField(blank=True, max_length=200)),
+                ("exchange_type", models.CharField(blank=True, max_length=10)),
+                ("routing_key", models.CharField(blank=True, max_length=200)),
+                ("body", models.TextField()),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ("id",),
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import models
+
+from common.timing import timed
+
+
+class OutboxMessage(models.Model):
+    """
+    The OutboxMessage model is a message waiting to be published to
+    RabbitMQ. Views write it in the same transaction as the change it
+    announces, so the message exists exactly when the change does, and
+    the relay_outbox management command publishes and then deletes it.
+
+    An empty exchange is RabbitMQ's default exchange, which routes to
+    the queue named by routing_key.
+    """
+
+    exchange = models.CharField(max_length=200, blank=True)
+    exchange_type = models.CharField(max_length=10, blank=True)
+    routing_key = models.CharField(max_length=200, blank=True)
+    body = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def to_queue(cls, queue, body):
+        with timed("outbox"):
+            return cls.objects.create(routing_key=queue, body=body)
+
+    @classmethod
+    def to_exchange(cls, exchange, body, exchange_type="fanout"):
+        with timed("outbox"):
+            return cls.objects.create(
+                exchange=exchange,
+                exchange_type=exchange_type,
+                body=body,
+            )
+
+    def __str__(self):
+        return f"{self.exchange or self.routing_key} #{self.id}"
+
+    class Meta:
+        ordering = ("id",)  # Messages are published in the order written
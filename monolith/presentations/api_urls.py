@@ -4,11 +4,17 @@ from .api_views import (
     api_list_presentations,
     api_show_presentation,
     api_approve_presentation,
-    api_reject_presentation
+    api_reject_presentation,
+    api_decide_presentations,
 )
 
 
 urlpatterns = [
+    path(
+        "presentations/decisions/",
+        api_decide_presentations,
+        name="api_decide_presentations",
+    ),
     path(
         "conferences/<int:conference_id>/presentations/",
         api_list_presentations,
@@ -1,10 +1,21 @@
 from django.http import JsonResponse
-from .models import Presentation, Status
+from .models import Presentation, Status, statuses
 from common.json import ModelEncoder
+from common.pagination import paginated_json_response
 from django.views.decorators.http import require_http_methods
 import json
-import pika
+from django.db import transaction
 from events.models import Conference
+from outbox.models import OutboxMessage
+
+
+# the queue each decision is announced on
+DECISION_QUEUES = {
+    "APPROVED": "presentation_approvals",
+    "REJECTED": "presentation_rejections",
+}
+# ids accepted by one bulk decision request
+MAX_BULK_DECISIONS = 1000
 
 
 class PresentationListEncoder(ModelEncoder):
@@ -13,6 +24,7 @@ class PresentationListEncoder(ModelEncoder):
         "title",
         "presenter_name",
     ]
+    extra_data_fields = ["status"]
 
     def get_extra_data(self, o):
         return {"status": o.status.name}
@@ -28,6 +40,7 @@ class PresentationDetailEncoder(ModelEncoder):
         "synopsis",
         "created",
     ]
+    extra_data_fields = ["status"]
 
     def get_extra_data(self, o):
         return {"status": o.status.name}
@@ -55,17 +68,23 @@ def api_list_presentations(request, conference_id):
             ...
         ]
     }
+
+    When the query string has a "limit" or a "cursor", only one page
+    of at most "limit" entries is returned, along with a "next" key
+    holding the URL of the following page (null on the last page).
     """
     if request.method == "GET":
         presentations = Presentation.objects.filter(conference=conference_id)
-        return JsonResponse(
-            {"presentations": presentations},
-            encoder=PresentationListEncoder,
+        return paginated_json_response(
+            request,
+            "presentations",
+            presentations,
+            PresentationListEncoder,
         )
     elif request.method == "POST":
         try:
             content = json.loads(request.body)
-            status = Status.objects.get(id=content["status"])
+            status = statuses.get(id=content["status"])
             conference = Conference.objects.get(id=conference_id)
             content["status"] = status
             content["conference"] = conference
@@ -132,7 +151,7 @@ def api_show_presentation(request, id):
         content = json.loads(request.body)
         try:
             if "status" in content:
-                status = Status.objects.get(id=content["status"])
+                status = statuses.get(id=content["status"])
                 content["status"] = status
         except Status.DoesNotExist:
             return JsonResponse(
@@ -176,17 +195,9 @@ def api_approve_presentation(request, pk):
         "title": title,
     }
     message = json.dumps(d)
-    presentation.approve()
-    parameters = pika.ConnectionParameters(host="rabbitmq")
-    connection = pika.BlockingConnection(parameters)
-    channel = connection.channel()
-    channel.queue_declare(queue="presentation_approvals")
-    channel.basic_publish(
-        exchange="",
-        routing_key="presentation_approvals",
-        body=message,
-    )
-    connection.close()
+    with transaction.atomic():
+        presentation.approve()
+        OutboxMessage.to_queue("presentation_approvals", message)
     return JsonResponse(
         presentation,
         encoder=PresentationDetailEncoder,
@@ -207,19 +218,88 @@ def api_reject_presentation(request, pk):
         "title": title,
     }
     message = json.dumps(d)
-    presentation.reject()
-    parameters = pika.ConnectionParameters(host="rabbitmq")
-    connection = pika.BlockingConnection(parameters)
-    channel = connection.channel()
-    channel.queue_declare(queue="presentation_rejections")
-    channel.basic_publish(
-        exchange="",
-        routing_key="presentation_rejections",
-        body=message,
-    )
-    connection.close()
+    with transaction.atomic():
+        presentation.reject()
+        OutboxMessage.to_queue("presentation_rejections", message)
     return JsonResponse(
         presentation,
         encoder=PresentationDetailEncoder,
         safe=False,
     )
+
+
+@require_http_methods(["PUT"])
+def api_decide_presentations(request):
+    """
+    Approves or rejects many presentations at once. The request body
+    names the new status and the presentation ids:
+
+    {
+        "status": "APPROVED" or "REJECTED",
+        "presentations": [presentation id, ...]
+    }
+
+    All of them are changed with one UPDATE, and their notifications
+    are queued in the same transaction. The response has one entry
+    per id, in request order:
+
+    {
+        "presentations": [
+            {"id": presentation id, "status": the new status name},
+            {"id": unknown id, "message": "Presentation not found"},
+            ...
+        ]
+    }
+    """
+    try:
+        content = json.loads(request.body)
+        name = content["status"]
+        ids = list(dict.fromkeys(content["presentations"]))
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return JsonResponse(
+            {"message": "Expected a status and a list of presentations"},
+            status=400,
+        )
+    if name not in DECISION_QUEUES:
+        return JsonResponse({"message": "Invalid status"}, status=400)
+    if not all(type(id) is int for id in ids):
+        return JsonResponse(
+            {"message": "Presentation ids must be integers"},
+            status=400,
+        )
+    if len(ids) > MAX_BULK_DECISIONS:
+        return JsonResponse(
+            {"message": f"At most {MAX_BULK_DECISIONS} presentations"},
+            status=400,
+        )
+
+    status = statuses.get(name=name)
+    with transaction.atomic():
+        found = {
+            row[0]: row
+            for row in Presentation.objects.select_for_update()
+            .filter(id__in=ids)
+            .values_list("id", "presenter_name", "presenter_email", "title")
+        }
+        Presentation.objects.filter(id__in=found).update(status=status)
+        OutboxMessage.objects.bulk_create(
+            OutboxMessage(
+                routing_key=DECISION_QUEUES[name],
+                body=json.dumps(
+                    {
+                        "presenter_name": presenter_name,
+                        "presenter_email": presenter_email,
+                        "title": title,
+                    }
+                ),
+            )
+            for _, presenter_name, presenter_email, title in found.values()
+        )
+
+    results = []
+    for id in ids:
+        if id in found:
+            results.append({"id": id, "status": name})
+        else:
+            results.append({"id": id, "message": "Presentation not found"})
+    return JsonResponse({"presentations": results})
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='presentation',
+            index=models.Index(fields=['conference', 'title', 'id'], name='presentation_keyset_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.urls import reverse
 
+from common.registry import ValueObjectRegistry
+
 
 class Status(models.Model):
     """
@@ -21,6 +23,11 @@ class Status(models.Model):
         verbose_name_plural = "statuses"  # Fix the pluralization
 
 
+# Status rows are looked up on every approval, rejection and new
+# presentation, and next to never change
+statuses = ValueObjectRegistry(Status, "name")
+
+
 class Presentation(models.Model):
     """
     The Presentation model represents a presentation that a person
@@ -49,33 +56,38 @@ class Presentation(models.Model):
 
     def approve(self):
         """
-        The method first retrieves a status object with the name "APPROVED"
-        using the get() method. It will retrieve a single object that matches
-        the specified criteria, which in this case is the status object
-        with the name "APPROVED"
+        Sets the status to APPROVED with a single UPDATE of the status
+        column; the APPROVED Status itself comes from the registry.
         """
-        status = Status.objects.get(name="APPROVED")
-        self.status = status
-        # you then proceed to save the changes to the database
-        self.save()
+        self.status = statuses.get(name="APPROVED")
+        self.save(update_fields=["status"])
 
     def reject(self):
-        status = Status.objects.get(name="REJECTED")
-        self.status = status
-        self.save()
+        self.status = statuses.get(name="REJECTED")
+        self.save(update_fields=["status"])
+
+    api_url_name = "api_show_presentation"
 
     def get_api_url(self):
-        return reverse("api_show_presentation", kwargs={"id": self.id})
+        return reverse(self.api_url_name, kwargs={"id": self.id})
 
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ("title",)  # Default ordering for presentation
+        indexes = [
+            # presentations are listed per conference, then paged by
+            # (title, id)
+            models.Index(
+                fields=["conference", "title", "id"],
+                name="presentation_keyset_idx",
+            ),
+        ]
 
     @classmethod
     def create(cls, **kwargs):
-        kwargs["status"] = Status.objects.get(name="SUBMITTED")
+        kwargs["status"] = statuses.get(name="SUBMITTED")
         presentation = cls(**kwargs)
         presentation.save()
         return presentation
@@ -0,0 +1,187 @@
+from datetime import datetime, timezone
+import itertools
+import json
+from unittest import mock
+
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from events.models import Conference, Location, State
+from outbox.models import OutboxMessage
+from .api_views import MAX_BULK_DECISIONS
+from .models import Presentation, Status, statuses
+
+
+STARTS = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+ids = itertools.count(1)
+
+
+class DecidePresentationsTests(TestCase):
+    """
+    The bulk approve/reject endpoint changes every presentation with one
+    UPDATE of the locked rows and queues one decision per presentation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for id, name in enumerate(["SUBMITTED", "APPROVED", "REJECTED"], 1):
+            Status.objects.create(id=id, name=name)
+        statuses.invalidate()
+        state = State.objects.create(name="Texas", abbreviation="TX")
+        cls.conference = Conference.objects.create(
+            name="Conference",
+            starts=STARTS,
+            ends=STARTS,
+            description="A conference.",
+            max_presentations=10,
+            max_attendees=100,
+            location=Location.objects.create(
+                name="Convention Center",
+                city="Austin",
+                room_count=10,
+                state=state,
+            ),
+        )
+
+    def add_presentation(self, status="SUBMITTED"):
+        n = next(ids)
+        return Presentation.objects.create(
+            presenter_name=f"Presenter {n}",
+            presenter_email=f"presenter{n}@example.com",
+            title=f"Talk {n}",
+            synopsis="A talk.",
+            status=statuses.get(name=status),
+            conference=self.conference,
+        )
+
+    def decide(self, status, presentations):
+        return self.client.put(
+            reverse("api_decide_presentations"),
+            json.dumps({"status": status, "presentations": presentations}),
+            content_type="application/json",
+        )
+
+    def decisions(self):
+        return [
+            (message.routing_key, json.loads(message.body))
+            for message in OutboxMessage.objects.all()
+        ]
+
+    def test_approves_and_queues_one_message_each(self):
+        presentations = [self.add_presentation() for _ in range(3)]
+        response = self.decide("APPROVED", [p.id for p in presentations])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "presentations": [
+                    {"id": p.id, "status": "APPROVED"} for p in presentations
+                ]
+            },
+        )
+        self.assertEqual(
+            set(Presentation.objects.values_list("status__name", flat=True)),
+            {"APPROVED"},
+        )
+        self.assertCountEqual(
+            self.decisions(),
+            [
+                (
+                    "presentation_approvals",
+                    {
+                        "presenter_name": p.presenter_name,
+                        "presenter_email": p.presenter_email,
+                        "title": p.title,
+                    },
+                )
+                for p in presentations
+            ],
+        )
+
+    def test_rejections_go_to_their_queue(self):
+        presentation = self.add_presentation()
+        self.decide("REJECTED", [presentation.id])
+        presentation.refresh_from_db()
+        self.assertEqual(presentation.status.name, "REJECTED")
+        ((queue, _),) = self.decisions()
+        self.assertEqual(queue, "presentation_rejections")
+
+    def test_missing_and_decided_ids(self):
+        submitted = self.add_presentation()
+        rejected = self.add_presentation("REJECTED")
+        missing = rejected.id + 1000
+        response = self.decide(
+            "APPROVED", [missing, submitted.id, rejected.id, submitted.id]
+        )
+        # one entry per id, in request order and without duplicates; a
+        # decided presentation is decided again, as by the approval PUT
+        self.assertEqual(
+            response.json(),
+            {
+                "presentations": [
+                    {"id": missing, "message": "Presentation not found"},
+                    {"id": submitted.id, "status": "APPROVED"},
+                    {"id": rejected.id, "status": "APPROVED"},
+                ]
+            },
+        )
+        rejected.refresh_from_db()
+        self.assertEqual(rejected.status.name, "APPROVED")
+        self.assertEqual(len(self.decisions()), 2)
+
+    def test_locks_rows_and_runs_one_update(self):
+        def run(count):
+            presentations = [self.add_presentation() for _ in range(count)]
+            with mock.patch.object(
+                QuerySet,
+                "select_for_update",
+                autospec=True,
+                side_effect=QuerySet.select_for_update,
+            ) as select_for_update:
+                with CaptureQueriesContext(connection) as queries:
+                    self.decide("APPROVED", [p.id for p in presentations])
+            select_for_update.assert_called_once()
+            return [query["sql"] for query in queries]
+
+        run(1)  # the status registry's first read
+        few, many = run(2), run(20)
+        self.assertEqual(len(few), len(many))
+        for sql in (few, many):
+            updates = [s for s in sql if s.startswith("UPDATE")]
+            inserts = [s for s in sql if s.startswith("INSERT")]
+            self.assertEqual(len(updates), 1)
+            self.assertIn('"presentations_presentation"', updates[0])
+            self.assertEqual(len(inserts), 1)
+            self.assertIn('"outbox_outboxmessage"', inserts[0])
+
+    def test_too_many_ids(self):
+        ids = list(range(1, MAX_BULK_DECISIONS + 2))
+        response = self.decide("APPROVED", ids)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            {"message": f"At most {MAX_BULK_DECISIONS} presentations"},
+        )
+        self.assertEqual(self.decide("APPROVED", ids[:-1]).status_code, 200)
+
+    def test_invalid_requests(self):
+        presentation = self.add_presentation()
+        for body in [
+            {"status": "APPROVED"},
+            {"status": "MAYBE", "presentations": [presentation.id]},
+            {"status": "APPROVED", "presentations": [str(presentation.id)]},
+        ]:
+            with self.subTest(body=body):
+                response = self.client.put(
+                    reverse("api_decide_presentations"),
+                    json.dumps(body),
+                    content_type="application/json",
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(OutboxMessage.objects.exists())
+        presentation.refresh_from_db()
+        self.assertEqual(presentation.status.name, "SUBMITTED")
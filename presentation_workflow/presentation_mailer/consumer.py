@@ -1,76 +1,115 @@
 import json
-import pika
-from pika.exceptions import AMQPConnectionError
 import django
 import os
-import time
+import smtplib
 import sys
-from django.core.mail import send_mail
+import threading
 
 
 sys.path.append("")
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "presentation_mailer.settings")
 django.setup()
 
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from common.consumer import Subscription, run
 
-while True:
-    try:
-        def process_approval(ch, method, properties, body):
-            message = json.loads(body)
-
-            email = message["presenter_email"]
-            name = message["presenter_name"]
-            title = message["title"]
-
-            sender = "admin@conference.go"
-            receiver = email
-            subject = "Your presentation has been accepted"
-            body = f"{name}, we're happy to tell you that your presentation {title} has been accepted"
-
-            send_mail(
-                subject,
-                body,
-                sender,
-                [receiver],
-                fail_silently=False,
-                )
-
-        def process_rejection(ch, method, properties, body):
-            message = json.loads(body)
-
-            email = message["presenter_email"]
-            name = message["presenter_name"]
-            title = message["title"]
-
-            sender = "admin@conference.go"
-            receiver = email
-            subject = "Your presentation has been rejected"
-            body = f"{name}, unfortunately, we have to inform you that your presentation {title} has been rejected"
-
-            send_mail(
-                subject,
-                body,
-                sender,
-                [receiver],
-                fail_silently=False,
-            )
-
-        parameters = pika.ConnectionParameters(host='rabbitmq')
-        connection = pika.BlockingConnection(parameters)
-        channel = connection.channel()
-        channel.queue_declare(queue='presentation_approvals')
-        channel.basic_consume(
-            queue='presentation_approvals',
-            on_message_callback=process_approval,
-            auto_ack=True,
-        )
-        channel.queue_declare(queue='presentation_rejections')
-        channel.basic_consume(
-            queue='presentation_rejections',
-            on_message_callback=process_rejection,
-            auto_ack=True,
-        )
-        channel.start_consuming()
-    except AMQPConnectionError:
-        print("Could not connect to RabbitMQ")
-        time.sleep(2.0)
+
+# every worker thread keeps one SMTP connection, opened on first use and
+# reopened whenever the server drops it
+local = threading.local()
+
+
+def mail_connection():
+    if not hasattr(local, "connection"):
+        local.connection = get_connection()
+    return local.connection
+
+
+def approval_email(message):
+    name = message["presenter_name"]
+    title = message["title"]
+    return EmailMessage(
+        "Your presentation has been accepted",
+        f"{name}, we're happy to tell you that your presentation {title} "
+        "has been accepted",
+        "admin@conference.go",
+        [message["presenter_email"]],
+    )
+
+
+def rejection_email(message):
+    name = message["presenter_name"]
+    title = message["title"]
+    return EmailMessage(
+        "Your presentation has been rejected",
+        f"{name}, unfortunately, we have to inform you that your "
+        f"presentation {title} has been rejected",
+        "admin@conference.go",
+        [message["presenter_email"]],
+    )
+
+
+def deliver(connection, email):
+    """
+    Sends one email over the worker's connection, reconnecting once if
+    the server has dropped it. Returns False when the server refused
+    the email for good.
+    """
+    for attempt in range(2):
+        try:
+            connection.open()
+            connection.send_messages([email])
+            return True
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused):
+            return False
+        except (smtplib.SMTPException, OSError):
+            try:
+                connection.close()
+            except (smtplib.SMTPException, OSError):
+                connection.connection = None
+            if attempt == 1:
+                raise
+
+
+def send_emails(build_email):
+    def handle(bodies):
+        """
+        Sends one email per message, in order, and returns how many
+        were dealt with before the mail server became unreachable.
+        """
+        connection = mail_connection()
+        for sent, body in enumerate(bodies):
+            try:
+                email = build_email(json.loads(body))
+            except (ValueError, KeyError, TypeError):
+                print("Dropping malformed message:", body)
+                continue
+            try:
+                if not deliver(connection, email):
+                    print("Mail server refused", email.to)
+            except (smtplib.SMTPException, OSError) as e:
+                print("Could not send email:", repr(e))
+                return sent
+        return None
+
+    return handle
+
+
+if __name__ == "__main__":
+    run(
+        [
+            Subscription(
+                "presentation_approvals",
+                send_emails(approval_email),
+                **settings.CONSUMER_QUEUES["presentation_approvals"],
+            ),
+            Subscription(
+                "presentation_rejections",
+                send_emails(rejection_email),
+                **settings.CONSUMER_QUEUES["presentation_rejections"],
+            ),
+        ],
+        settings.BROKER_HOST,
+        settings.BROKER_PORT,
+    )
@@ -7,3 +7,16 @@ USE_TZ = True
 
 EMAIL_HOST = "mail"
 EMAIL_SUBJECT_PREFIX = ""
+# the consumer keeps one SMTP connection open; don't let a stalled
+# server hang it
+EMAIL_TIMEOUT = 10
+
+# Every queue gets "workers" threads, each with its own RabbitMQ
+# connection, a prefetch of one batch and its own SMTP connection, so
+# emails go out over that many SMTP connections at once.
+BROKER_HOST = "rabbitmq"
+BROKER_PORT = 5672
+CONSUMER_QUEUES = {
+    "presentation_approvals": {"workers": 4, "batch_size": 20},
+    "presentation_rejections": {"workers": 2, "batch_size": 20},
+}